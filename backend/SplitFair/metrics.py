@@ -0,0 +1,95 @@
+# SplitFair/metrics.py
+"""
+In-process request metrics collected by SplitFair.middleware.RequestMetricsMiddleware.
+
+For every URL name the last ``WINDOW`` requests are kept in a ring buffer;
+percentiles are computed when somebody asks (the metrics view), never on the
+request path. The numbers are per process - each worker has its own.
+"""
+
+import threading
+from collections import deque
+
+from django.contrib.admin.views.decorators import staff_member_required
+
+from events.cache import cache_stats
+
+from .responses import JsonResponse
+
+WINDOW = 1024
+
+
+class _Series:
+    __slots__ = ("count", "durations", "queries", "db_time", "duplicates")
+
+    def __init__(self):
+        self.count = 0
+        self.durations = deque(maxlen=WINDOW)
+        self.queries = deque(maxlen=WINDOW)
+        self.db_time = deque(maxlen=WINDOW)
+        self.duplicates = 0
+
+
+_lock = threading.Lock()
+_series = {}
+
+
+def record(name, duration, queries=None, db_time=None, duplicates=0):
+    """Called once per request; ``queries``/``db_time`` are None when not measured."""
+    with _lock:
+        series = _series.get(name)
+        if series is None:
+            series = _series[name] = _Series()
+        series.count += 1
+        series.durations.append(duration)
+        if queries is not None:
+            series.queries.append(queries)
+            series.db_time.append(db_time)
+        series.duplicates += duplicates
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def snapshot():
+    with _lock:
+        copies = {
+            name: (s.count, sorted(s.durations), list(s.queries), list(s.db_time), s.duplicates)
+            for name, s in _series.items()
+        }
+
+    result = {}
+    for name, (count, durations, queries, db_time, duplicates) in sorted(copies.items()):
+        result[name] = {
+            "count": count,
+            "window": len(durations),
+            "p50_ms": _ms(_percentile(durations, 50)),
+            "p95_ms": _ms(_percentile(durations, 95)),
+            "p99_ms": _ms(_percentile(durations, 99)),
+            "avg_queries": round(sum(queries) / len(queries), 2) if queries else None,
+            "max_queries": max(queries) if queries else None,
+            "avg_db_ms": _ms(sum(db_time) / len(db_time)) if db_time else None,
+            "duplicate_queries": duplicates,
+        }
+    return result
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+@staff_member_required
+def metrics_view(request):
+    return JsonResponse({
+        "requests": snapshot(),
+        "settlement_cache": cache_stats(),
+    })
@@ -0,0 +1,129 @@
+# SplitFair/middleware.py
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("splitfair.metrics")
+
+
+class QueryCollector:
+    """``connection.execute_wrapper`` hook: counts queries, DB time and repeated SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Queries whose SQL (without params) already ran in this request - N+1 suspects."""
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+
+class RequestMetricsMiddleware:
+    """
+    Per request: wall time, query count, DB time and repeated queries.
+
+    Adds a ``Server-Timing`` header and feeds SplitFair.metrics (shown at
+    admin/metrics/). Turn off with ``REQUEST_METRICS_ENABLED = False``.
+
+    Database connections are per thread. Under WSGI the wrapper goes on the
+    request thread's connections around the whole chain. Under ASGI the chain
+    runs on the event loop, but sync views and the ORM calls of async views
+    (``sync_to_async``, thread sensitive) run in one thread per request (the
+    handler's ``ThreadSensitiveContext``). ``process_view`` is sync, so Django
+    calls it in that thread, and it puts the wrapper on that thread's
+    connections. Queries made before the view, e.g. by other middleware, and
+    queries from ``thread_sensitive=False`` calls are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_METRICS_ENABLED", True)
+        self.duplicate_warning = getattr(settings, "REQUEST_METRICS_DUPLICATE_WARNING", 10)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        self._finish(request, response, time.perf_counter() - started, collector)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        request._metrics_collector = collector = QueryCollector()
+        request._metrics_connections = []
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            for connection in request._metrics_connections:
+                connection.execute_wrappers.remove(collector)
+        self._finish(request, response, time.perf_counter() - started, collector)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # ASGI only, runs in the request's sync thread (see the class docstring)
+        collector = getattr(request, "_metrics_collector", None)
+        if collector is not None:
+            for connection in connections.all():
+                connection.execute_wrappers.append(collector)
+                request._metrics_connections.append(connection)
+        return None
+
+    def _finish(self, request, response, duration, collector):
+        match = request.resolver_match
+        name = (match.view_name if match else None) or "<unresolved>"
+
+        timings = [f"app;dur={duration * 1000:.1f}"]
+        if collector is not None:
+            timings.append(
+                f'db;dur={collector.seconds * 1000:.1f};desc="{collector.count} queries, '
+                f'{collector.duplicates} repeated"'
+            )
+            if collector.duplicates >= self.duplicate_warning:
+                logger.warning(
+                    "%s ran %d queries, %d of them repeated",
+                    request.path, collector.count, collector.duplicates,
+                )
+        response["Server-Timing"] = ", ".join(timings)
+
+        metrics.record(
+            name,
+            duration,
+            queries=collector.count if collector else None,
+            db_time=collector.seconds if collector else None,
+            duplicates=collector.duplicates if collector else 0,
+        )
@@ -0,0 +1,17 @@
+# SplitFair/renderers.py
+"""
+DRF renderer with the same encoder as SplitFair.responses.JsonResponse
+(orjson when installed, the stdlib fallback otherwise), so DRF views send the
+same JSON as the plain Django views.
+"""
+
+from rest_framework import renderers
+
+from .responses import dumps
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
@@ -0,0 +1,94 @@
+# SplitFair/responses.py
+"""
+JSON responses for the API views.
+
+``JsonResponse`` is a drop-in for ``django.http.JsonResponse``. It encodes with
+orjson when that is installed and with the stdlib ``json`` module otherwise.
+Both encoders give the same output:
+
+- compact, UTF-8 (no ``\\uXXXX`` escapes);
+- ``date`` / ``datetime`` / ``time`` as ``isoformat()``, ``UUID`` as a string;
+- ``Decimal`` as a string (``"12.50"``), as Django's encoder does;
+- non-string dict keys (user ids) as strings.
+
+orjson handles dates and UUIDs natively and only calls back into Python for
+Decimal and other unusual types, so views can hand over raw database values
+instead of converting each one first.
+
+``value_rows`` turns a queryset into response-ready dicts through
+``values_list()``, without building model instances.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+
+# the common database types by exact type, before DjangoJSONEncoder's isinstance chain;
+# datetimes in full isoformat like orjson (DjangoJSONEncoder cuts to milliseconds)
+_CONVERTERS = {
+    Decimal: str,
+    datetime.date: datetime.date.isoformat,
+    datetime.datetime: datetime.datetime.isoformat,
+    datetime.time: datetime.time.isoformat,
+}
+
+
+class _Encoder(DjangoJSONEncoder):
+    def default(self, o):
+        convert = _CONVERTERS.get(type(o))
+        if convert is not None:
+            return convert(o)
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+_stdlib_encoder = _Encoder(ensure_ascii=False, separators=(",", ":"))
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    _default = _stdlib_encoder.default
+
+    def dumps(data):
+        """``data`` as JSON bytes."""
+        return orjson.dumps(data, default=_default, option=_OPTIONS)
+
+    ENCODER = "orjson"
+else:
+    def dumps(data):
+        """``data`` as JSON bytes."""
+        return _stdlib_encoder.encode(data).encode()
+
+    ENCODER = "json"
+
+
+class JsonResponse(HttpResponse):
+    """Like ``django.http.JsonResponse``; ``safe=False`` is needed for non-dict data."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def value_rows(queryset, *fields, **renamed):
+    """
+    ``[{field: value, ...}]`` read with ``values_list()``: no model instances,
+    and the values (Decimal, date, ...) are left for the encoder.
+
+    ``renamed`` maps an output key to a lookup or expression, e.g.
+    ``value_rows(qs, 'id', payer='payer__username')``; unlike ``values()``
+    the key may be the name of a model field (``event='event_id'``).
+    """
+    names = list(fields) + list(renamed)
+    return [dict(zip(names, row)) for row in queryset.values_list(*fields, *renamed.values())]
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
     # Your Project Apps
     'events',  # Your application for managing events, transactions, etc.
     'accounts',  # Your application for handling user login and registration.
+    'jobs',  # Background jobs (DB-backed queue, manage.py run_workers).
     # ----------------------------------
 ]
 
@@ -52,6 +53,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # query count / timing per request, Server-Timing header, admin/metrics/
+    'SplitFair.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +64,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+REQUEST_METRICS_ENABLED = True
+# log a warning when one request repeats the same SQL this many times
+REQUEST_METRICS_DUPLICATE_WARNING = 10
+
 ROOT_URLCONF = 'SplitFair.urls'
 
 TEMPLATES = [
@@ -92,6 +99,62 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Settlement plans get their own alias so they can be moved to a shared
+# backend (Redis, Memcached, DB) without touching anything else. LocMemCache
+# evicts least-recently-used entries; CULL_FREQUENCY = MAX_ENTRIES makes it
+# drop one entry at a time when full.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'settlement': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'settlement-plans',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'CULL_FREQUENCY': 1000,
+        },
+    },
+}
+
+SETTLEMENT_CACHE_ALIAS = 'settlement'
+
+# Threads for settlement computations started from async views
+SETTLEMENT_THREAD_POOL_SIZE = 4
+
+# Exact minimum-transfers solver: groups with more non-zero balances, or that
+# take longer than the budget (seconds), get the greedy plan instead
+SETTLEMENT_EXACT_MAX_PARTICIPANTS = 14
+SETTLEMENT_EXACT_TIME_BUDGET = 0.1
+
+# Incremental plans (events.planner): events tracked per process, and how far
+# a repaired plan may exceed n - 1 transfers before it is recomputed
+SETTLEMENT_PLANNER_MAX_EVENTS = 256
+SETTLEMENT_PLANNER_DRIFT = 0.25
+
+# Background jobs (jobs app): attempts per job, retry backoff in seconds
+# (doubles per attempt, capped) and where uploads wait for their job
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_BACKOFF = 5
+JOBS_RETRY_BACKOFF_MAX = 3600
+# seconds between locked_at updates of a running job (run_workers --stale-after must be larger)
+JOBS_HEARTBEAT = 30
+JOB_FILES_DIR = BASE_DIR / 'job_files'
+
+# Transaction description search (events.search): "auto" picks SQLite FTS5,
+# PostgreSQL tsvector or plain icontains by database; or a backend class path
+TRANSACTION_SEARCH_BACKEND = 'auto'
+
+# Username autocomplete (accounts.usernames): per-process LRU size and TTL (s)
+USERNAME_AUTOCOMPLETE_CACHE_SIZE = 4096
+USERNAME_AUTOCOMPLETE_CACHE_TTL = 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,136 @@
+import datetime
+import json
+import re
+import unittest
+import uuid
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+
+from events.models import Event, Transaction
+
+from . import metrics, responses
+from .middleware import QueryCollector
+from .renderers import JSONRenderer
+from .responses import JsonResponse, dumps, value_rows
+
+User = get_user_model()
+
+
+def _db_timing(response):
+    """(queries, repeated) from the Server-Timing header, None without a db entry."""
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) repeated"', response['Server-Timing'])
+    return (int(match[1]), int(match[2])) if match else None
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('metrics')
+        self.event = Event.objects.create(title='Trip', owner=self.user)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        with metrics._lock:
+            metrics._series.clear()
+
+    def test_sync_request(self):
+        response = self.client.get('/api/events/')
+        queries, _ = _db_timing(response)
+        self.assertGreater(queries, 0)
+        self.assertEqual(metrics.snapshot()['events_list_api']['max_queries'], queries)
+
+    async def test_sync_view_under_asgi_counts_the_same_queries(self):
+        sync = _db_timing(await sync_to_async(self.client.get)('/api/events/'))
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_db_timing(response), sync)
+
+    async def test_async_view_queries_are_counted(self):
+        response = await self.async_client.get(f'/api/async/events/{self.event.id}/balances/')
+        self.assertEqual(response.status_code, 200)
+        queries, _ = _db_timing(response)
+        self.assertGreater(queries, 0)
+        # the wrapper is removed again afterwards
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_disabled(self):
+        with override_settings(REQUEST_METRICS_ENABLED=False):
+            client = Client()
+            client.force_login(self.user)
+            response = client.get('/api/events/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_repeated_queries(self):
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            for pk in (1, 2, 3):
+                Event.objects.filter(pk=pk).exists()
+            User.objects.count()
+        self.assertEqual((collector.count, collector.duplicates), (4, 2))
+
+
+SAMPLE = {
+    'amount': Decimal('12.50'),
+    'total': Decimal('-0.10'),
+    'date': datetime.date(2024, 3, 1),
+    'created_at': datetime.datetime(2024, 3, 1, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2024, 3, 1, 9, 30),
+    'time': datetime.time(18, 5, 7, 250),
+    'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'city': 'Київ €',
+    1: [None, True, 0.5, 3],
+    'nested': [{'amount': Decimal('1'), 7: datetime.date(2024, 1, 2)}],
+}
+
+
+class EncoderTests(TestCase):
+    def test_stdlib_encoder(self):
+        encoded = responses._stdlib_encoder.encode(SAMPLE)
+        self.assertNotIn(' ', encoded.replace('Київ €', ''))
+        self.assertEqual(json.loads(encoded), {
+            'amount': '12.50',
+            'total': '-0.10',
+            'date': '2024-03-01',
+            'created_at': '2024-03-01T09:30:15.123456+00:00',
+            'naive': '2024-03-01T09:30:00',
+            'time': '18:05:07.000250',
+            'id': '12345678-1234-5678-1234-567812345678',
+            'city': 'Київ €',
+            '1': [None, True, 0.5, 3],
+            'nested': [{'amount': '1', '7': '2024-01-02'}],
+        })
+
+    @unittest.skipUnless(responses.orjson, 'orjson is not installed')
+    def test_orjson_matches_stdlib(self):
+        self.assertEqual(responses.ENCODER, 'orjson')
+        self.assertEqual(dumps(SAMPLE), responses._stdlib_encoder.encode(SAMPLE).encode())
+
+    def test_json_response(self):
+        response = JsonResponse({'amount': Decimal('2.00')}, status=201)
+        self.assertEqual((response.status_code, response['Content-Type']), (201, 'application/json'))
+        self.assertEqual(response.content, b'{"amount":"2.00"}')
+
+        with self.assertRaises(TypeError):
+            JsonResponse([1, 2])
+        self.assertEqual(JsonResponse([1, 2], safe=False).content, b'[1,2]')
+
+    def test_drf_renderer(self):
+        self.assertEqual(JSONRenderer().render(SAMPLE), dumps(SAMPLE))
+        self.assertEqual(JSONRenderer().render(None), b'')
+
+    def test_value_rows(self):
+        user = User.objects.create_user('rows')
+        event = Event.objects.create(title='Trip', owner=user)
+        Transaction.objects.create(event=event, payer=user, amount=Decimal('9.99'), description='Taxi')
+        Transaction.objects.update(date=datetime.date(2024, 5, 6))  # auto_now_add
+        with self.assertNumQueries(1):
+            rows = value_rows(Transaction.objects.all(), 'amount', 'date', event='event_id', payer='payer__username')
+        self.assertEqual(rows, [{
+            'amount': Decimal('9.99'), 'date': datetime.date(2024, 5, 6), 'event': event.id, 'payer': 'rows',
+        }])
+        self.assertEqual(
+            dumps(rows), f'[{{"amount":"9.99","date":"2024-05-06","event":{event.id},"payer":"rows"}}]'.encode(),
+        )
@@ -1,13 +1,17 @@
 # SplitFair/urls.py
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import metrics_view
 
 urlpatterns = [
     # админка Django
+    path("admin/metrics/", metrics_view, name="metrics"),
     path("admin/", admin.site.urls),
 
     # все наши страницы (главная, регистрация, логин, логаут)
     path("", include("accounts.urls")),
 
      path("api/events/", include("events.api_urls")),
+     path("api/async/events/", include("events.async_urls")),
+     path("api/jobs/", include("jobs.urls")),
 ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_folded_usernames(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    FoldedUsername = apps.get_model('accounts', 'FoldedUsername')
+    batch = []
+    for pk, username in User.objects.values_list('pk', 'username').iterator(chunk_size=5000):
+        batch.append(FoldedUsername(user_id=pk, folded=username.casefold()))
+        if len(batch) >= 5000:
+            FoldedUsername.objects.bulk_create(batch)
+            batch = []
+    FoldedUsername.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoldedUsername',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='folded_username', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('folded', models.CharField(db_index=True, max_length=150)),
+            ],
+        ),
+        migrations.RunPython(backfill_folded_usernames, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,18 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class FoldedUsername(models.Model):
+    """
+    Case-folded copy of ``User.username`` for prefix lookups (see
+    accounts.usernames). Kept in sync by accounts.signals and by code that
+    bulk-creates users.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='folded_username',
+    )
+    # prefix search is a range scan on this index: folded >= "ab" AND folded < "ac"
+    folded = models.CharField(max_length=150, db_index=True)
+
+    def __str__(self):
+        return self.folded
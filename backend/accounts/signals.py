@@ -0,0 +1,14 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .usernames import index_users
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # last_login / password saves do not touch the indexed username
+    if raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    index_users([instance])
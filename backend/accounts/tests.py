@@ -1,3 +1,86 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from events.models import Event, EventParticipant
+
+from . import usernames
+from .models import FoldedUsername
+from .usernames import autocomplete, index_users
+
+User = get_user_model()
+
+
+class UsernameAutocompleteTests(TestCase):
+    def setUp(self):
+        usernames._cache.clear()
+        self.me = User.objects.create_user('Olena')
+        self.friend = User.objects.create_user('Oksana')
+        self.owner = User.objects.create_user('OLEG')
+        for name in ('Oleksii', 'Olha', 'Orest', 'Petro'):
+            User.objects.create_user(name)
+        event = Event.objects.create(title='Trip', owner=self.owner)
+        EventParticipant.objects.create(event=event, user=self.me)
+        EventParticipant.objects.create(event=event, user=self.friend)
+
+    def names(self, prefix, limit=usernames.LIMIT):
+        return [(name, shared) for _, name, shared in autocomplete(self.me.id, prefix, limit)]
+
+    def test_shared_contacts_first_then_everybody_else(self):
+        self.assertEqual(self.names('o'), [
+            ('Oksana', True), ('OLEG', True), ('Oleksii', False), ('Olha', False), ('Orest', False),
+        ])
+
+    def test_prefix_is_case_folded_and_excludes_the_user(self):
+        self.assertEqual(self.names('  OL '), [('OLEG', True), ('Oleksii', False), ('Olha', False)])
+        self.assertEqual(self.names('olena'), [])
+        self.assertEqual(self.names('   '), [])
+
+    def test_limit(self):
+        self.assertEqual(self.names('o', limit=3), [('Oksana', True), ('OLEG', True), ('Oleksii', False)])
+        self.assertEqual(self.names('o', limit=1), [('Oksana', True)])
+
+    def test_complete_shorter_prefix_answers_longer_ones_without_queries(self):
+        self.names('ol')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('ole'), [('OLEG', True), ('Oleksii', False)])
+
+    def test_incomplete_shorter_prefix_is_not_reused(self):
+        self.assertEqual(len(self.names('o', limit=2)), 2)
+        self.assertEqual(self.names('or', limit=2), [('Orest', False)])
+
+    def test_saves_keep_the_index_in_sync(self):
+        user = User.objects.get(username='Petro')
+        user.username = 'Pavlo'
+        user.save()
+        self.assertEqual(FoldedUsername.objects.get(user=user).folded, 'pavlo')
+
+        # saves that do not touch the username leave it alone
+        FoldedUsername.objects.filter(user=user).update(folded='stale')
+        user.save(update_fields=['last_login'])
+        self.assertEqual(FoldedUsername.objects.get(user=user).folded, 'stale')
+
+    def test_index_users_after_bulk_create(self):
+        created = User.objects.bulk_create([User(username='Ostap'), User(username='ÖZGÜR')])
+        self.assertFalse(FoldedUsername.objects.filter(user__in=created).exists())
+        index_users(created)
+        self.assertEqual(
+            sorted(FoldedUsername.objects.filter(user__in=created).values_list('folded', flat=True)),
+            ['ostap', 'özgür'],
+        )
+
+    def test_api(self):
+        self.client.force_login(self.me)
+        response = self.client.get('/api/users/autocomplete/', {'q': 'ol', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [
+            {'id': self.owner.id, 'username': 'OLEG', 'shared': True},
+            {'id': User.objects.get(username='Oleksii').id, 'username': 'Oleksii', 'shared': False},
+        ]})
+
+        response = self.client.get('/api/users/autocomplete/', {'q': 'ol', 'limit': 'many'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/users/autocomplete/').json(), {'results': []})
+
+    def test_api_requires_login(self):
+        response = self.client.get('/api/users/autocomplete/', {'q': 'ol'})
+        self.assertEqual(response.status_code, 302)
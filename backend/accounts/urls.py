@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
-from .views import index_view, register_view, csrf_token_view, api_login, dashboard_view
+from .views import index_view, register_view, csrf_token_view, api_login, dashboard_view, username_autocomplete_api
 from events.views import create_event_view
 
 urlpatterns = [
@@ -25,6 +25,7 @@ urlpatterns = [
     # React-friendly API endpoints
     path("api/login/", api_login, name="api_login"),
     path("csrf-token/", csrf_token_view, name="csrf_token"),
+    path("api/users/autocomplete/", username_autocomplete_api, name="username_autocomplete_api"),
     path("dashboard/", dashboard_view, name="dashboard"),
     path("event/create/", create_event_view, name="create_event"),
 ]
@@ -0,0 +1,145 @@
+# accounts/usernames.py
+"""
+Username autocomplete.
+
+Lookups go to ``FoldedUsername.folded`` (``username.casefold()``, indexed) as
+a range ``folded >= prefix AND folded < next(prefix)``, which any B-tree index
+answers without a scan, unlike ``istartswith``/``LIKE`` on SQLite. On
+PostgreSQL the column needs a "C" collation (or a ``varchar_pattern_ops``
+index) for the range to follow code point order.
+
+People the user already shares an event with (owner or participant) come
+first. Their names are loaded once per user and filtered in Python; the rest
+is one indexed range query with LIMIT.
+
+Both the per-user contact lists and the per-(user, prefix) results are kept in
+a bounded per-process LRU with a short TTL. A prefix whose cached result was
+complete (fewer hits than the limit) also answers every longer prefix typed
+after it without a query.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+
+from events.models import Event, EventParticipant
+
+from .models import FoldedUsername
+
+LIMIT = 10
+CACHE_SIZE = 4096
+CACHE_TTL = 60  # seconds
+
+
+def fold(username):
+    return username.casefold()
+
+
+def index_users(users):
+    """Create/refresh the FoldedUsername rows of ``users`` (needed after bulk_create)."""
+    rows = [FoldedUsername(user_id=user.pk, folded=fold(user.username)) for user in users]
+    FoldedUsername.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['user'], update_fields=['folded'],
+    )
+
+
+class _LRU:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_cache = _LRU(
+    getattr(settings, 'USERNAME_AUTOCOMPLETE_CACHE_SIZE', CACHE_SIZE),
+    getattr(settings, 'USERNAME_AUTOCOMPLETE_CACHE_TTL', CACHE_TTL),
+)
+
+
+def _prefix_range(prefix):
+    return Q(folded__gte=prefix, folded__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def _contacts(user_id):
+    """``[(folded, user id, username)]`` of everybody sharing an event with the user, sorted."""
+    key = ('contacts', user_id)
+    contacts = _cache.get(key)
+    if contacts is None:
+        events = Event.objects.filter(Q(owner_id=user_id) | Q(participants__user_id=user_id)).values('id')
+        user_ids = (
+            EventParticipant.objects.filter(event_id__in=events).values('user_id')
+            .union(Event.objects.filter(id__in=events).values('owner_id'))
+        )
+        contacts = sorted(
+            FoldedUsername.objects.filter(user_id__in=user_ids).exclude(user_id=user_id)
+            .values_list('folded', 'user_id', 'user__username')
+        )
+        _cache.set(key, contacts)
+    return contacts
+
+
+def _lookup(user_id, prefix, limit):
+    shared = [
+        (pk, username) for folded, pk, username in _contacts(user_id) if folded.startswith(prefix)
+    ][:limit]
+    skip = [pk for pk, _ in shared] + [user_id]
+    others = list(
+        FoldedUsername.objects.filter(_prefix_range(prefix)).exclude(user_id__in=skip)
+        .order_by('folded').values_list('user_id', 'user__username')[:limit - len(shared)]
+    )
+    complete = len(others) < limit - len(shared)
+    results = [(pk, name, True) for pk, name in shared] + [(pk, name, False) for pk, name in others]
+    return results, complete
+
+
+def autocomplete(user_id, prefix, limit=LIMIT):
+    """
+    Up to ``limit`` ``(user id, username, shared)`` matches for ``prefix``,
+    shared-event contacts first, then everybody else, each in name order.
+    The requesting user is never included.
+    """
+    prefix = fold(prefix.strip())
+    if not prefix:
+        return []
+
+    cached = _cache.get(('prefix', user_id, prefix, limit))
+    if cached is None:
+        # a complete result for a shorter prefix already holds every match
+        for cut in range(len(prefix) - 1, 0, -1):
+            shorter = _cache.get(('prefix', user_id, prefix[:cut], limit))
+            if shorter is not None and shorter[1]:
+                cached = (
+                    [row for row in shorter[0] if fold(row[1]).startswith(prefix)],
+                    True,
+                )
+                break
+        else:
+            cached = _lookup(user_id, prefix, limit)
+        _cache.set(('prefix', user_id, prefix, limit), cached)
+    return cached[0]
@@ -1,6 +1,6 @@
 # accounts/views.py
 from django.contrib.auth import authenticate, login
-from django.http import JsonResponse
+from SplitFair.responses import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.middleware.csrf import get_token
@@ -8,7 +8,9 @@ from django.shortcuts import render, redirect
 from .forms import RegisterForm
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import ensure_csrf_cookie
-from events.models import Event
+from django.views.decorators.http import require_GET
+from events.listing import owned_events_page
+from .usernames import LIMIT, autocomplete
 
 
 def index_view(request):
@@ -55,7 +57,28 @@ def csrf_token_view(request):
 @login_required
 @ensure_csrf_cookie
 def dashboard_view(request):
-    user_events = Event.objects.filter(owner=request.user).order_by('-created_at')
+    try:
+        user_events, next_cursor = owned_events_page(request.user, request.GET.get('cursor'))
+    except ValueError:
+        return redirect("dashboard")
     return render(request, "dashboard.html", {
-        "user_events": user_events
+        "user_events": user_events,
+        "next_cursor": next_cursor,
+    })
+
+
+@login_required
+@require_GET
+def username_autocomplete_api(request):
+    """?q=<prefix>[&limit=n]: usernames for the participants field, people you share events with first."""
+    try:
+        limit = min(max(int(request.GET.get('limit', LIMIT)), 1), 25)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    matches = autocomplete(request.user.id, request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'results': [
+            {'id': user_id, 'username': username, 'shared': shared}
+            for user_id, username, shared in matches
+        ],
     })
@@ -0,0 +1,61 @@
+"""
+Helpers shared by the benchmark scripts: report metadata, writing the JSON
+report and ``--compare`` against a baseline. Standard library only, the
+scripts import it as ``_common`` from this directory.
+"""
+
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_meta(**extra):
+    """Where and when a report was made, plus the script's own settings."""
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **extra,
+    }
+
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {path}")
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current, baseline, threshold, label=str):
+    """
+    Print ``current / baseline`` for every key of ``current`` ({key: number},
+    lower is better) that the baseline has too; returns how many ratios are
+    above ``threshold``.
+    """
+    regressions = 0
+    for key, value in current.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        ratio = value / old
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  <-- slower"
+        print(f"{label(key)}  x{ratio:5.2f}{flag}")
+    return regressions
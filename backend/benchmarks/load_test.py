@@ -0,0 +1,340 @@
+"""
+HTTP load test against a running SplitFair server.
+
+    python manage.py seed_load_data --users 200
+    python manage.py runserver --noreload            # or any ASGI/WSGI server
+    python benchmarks/load_test.py --users 200 --concurrency 50 --duration 30
+    python benchmarks/load_test.py -o new.json --compare old.json
+
+Each of ``--concurrency`` virtual users logs in as one of the seeded users
+(``<prefix>0 ..``) over its own keep-alive connection and cookie jar, then
+until ``--duration`` runs out picks requests from the ``--mix``:
+
+- ``dashboard``: ``GET /dashboard/`` (HTML) and ``GET /api/events/``
+- ``settlement``: ``GET /api/events/<id>/settlement/`` of one of its events
+- ``create_event``: ``POST /api/events/create/`` with the CSRF token
+
+Logins are measured too. Per endpoint the report has the request count,
+throughput, error rate (status >= 400 or a transport error), status codes and
+p50/p95/p99 latency. Results are written as JSON; ``--compare`` prints the
+p95 ratio against an earlier file and exits with status 1 if any endpoint got
+slower than ``--threshold``.
+
+The HTTP/1.1 client is a few lines on top of ``asyncio.open_connection``, so
+the script needs nothing beyond the standard library and does not import
+Django.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import ssl
+import sys
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from _common import compare, load_report, report_meta, write_report
+
+MIX = "dashboard=5,settlement=4,create_event=1"
+
+
+class Response:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection with a cookie jar; reconnects when the server closes it."""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout
+        )
+
+    async def request(self, method, path, body=b"", headers=None):
+        reused = self.writer is not None
+        if not reused:
+            await self._connect()
+        try:
+            return await asyncio.wait_for(self._exchange(method, path, body, headers), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        # the server closed the kept-alive connection meanwhile: once more on a fresh one
+        await self._connect()
+        return await asyncio.wait_for(self._exchange(method, path, body, headers), self.timeout)
+
+    async def _exchange(self, method, path, body, headers):
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host_header}",
+            "Connection: keep-alive",
+            f"Content-Length: {len(body)}",
+        ]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        response_headers = defaultdict(list)
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()].append(value.strip())
+
+        for cookie in response_headers.get("set-cookie", ()):
+            name, _, value = cookie.split(";", 1)[0].partition("=")
+            self.cookies[name.strip()] = value.strip()
+
+        if "chunked" in ",".join(response_headers.get("transfer-encoding", ())).lower():
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if not size:
+                    await self.reader.readuntil(b"\r\n")  # no trailers expected
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            payload = b"".join(chunks)
+        elif "content-length" in response_headers:
+            payload = await self.reader.readexactly(int(response_headers["content-length"][0]))
+        else:
+            payload = await self.reader.read()
+            await self.close()
+            return Response(status, response_headers, payload)
+
+        if "close" in ",".join(response_headers.get("connection", ())).lower():
+            await self.close()
+        return Response(status, response_headers, payload)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = Counter()
+
+    def record(self, endpoint, seconds, status=None, error=None):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status if status is not None else type(error).__name__] += 1
+        if error is not None or status >= 400:
+            self.errors[endpoint] += 1
+
+
+def percentile(ordered, p):
+    # nearest rank
+    if not ordered:
+        return None
+    return ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+
+
+class VirtualUser:
+    def __init__(self, n, args, stats):
+        self.username = f"{args.prefix}{n % args.users}"
+        self.args = args
+        self.stats = stats
+        self.client = Client(args.url, args.timeout)
+        self.event_ids = []
+        self.rng = random.Random(args.seed + n)
+
+    async def call(self, endpoint, method, path, body=b"", headers=None, expect=200):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, body, headers)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            await self.client.close()
+            self.stats.record(endpoint, time.perf_counter() - started, error=e)
+            return None
+        self.stats.record(endpoint, time.perf_counter() - started, status=response.status)
+        return response if response.status == expect else None
+
+    async def login(self):
+        body = urlencode({"username": self.username, "password": self.args.password}).encode()
+        response = await self.call("login", "POST", "/api/login/", body,
+                                   {"Content-Type": "application/x-www-form-urlencoded"})
+        if response is None:
+            return False
+        await self.call("csrf_token", "GET", "/csrf-token/")
+        return True
+
+    async def dashboard(self):
+        await self.call("dashboard", "GET", "/dashboard/")
+        response = await self.call("events_list", "GET", "/api/events/")
+        if response is not None:
+            self.event_ids = [event["id"] for event in response.json()["results"]] or self.event_ids
+
+    async def settlement(self):
+        if not self.event_ids:
+            await self.dashboard()
+        if self.event_ids:
+            await self.call("settlement", "GET", f"/api/events/{self.rng.choice(self.event_ids)}/settlement/")
+
+    async def create_event(self):
+        body = json.dumps({
+            "title": f"Load test {self.username} {time.time():.0f}",
+            "participants": [f"{self.args.prefix}{self.rng.randrange(self.args.users)}"],
+        }).encode()
+        await self.call("create_event", "POST", "/api/events/create/", body, {
+            "Content-Type": "application/json",
+            "X-CSRFToken": self.client.cookies.get("csrftoken", ""),
+        }, expect=201)
+
+    async def run(self, deadline, mix):
+        try:
+            if not await self.login():
+                return
+            actions = [getattr(self, name) for name in mix]
+            weights = list(mix.values())
+            while time.perf_counter() < deadline:
+                await self.rng.choices(actions, weights)[0]()
+        finally:
+            await self.client.close()
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("dashboard", "settlement", "create_event"):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def run_load(args):
+    stats = Stats()
+    mix = parse_mix(args.mix)
+    deadline = time.perf_counter() + args.duration
+    users = [VirtualUser(n, args, stats) for n in range(args.concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(user.run(deadline, mix) for user in users))
+    return stats, time.perf_counter() - started
+
+
+def summarize(stats, elapsed):
+    endpoints = {}
+    for endpoint, latencies in sorted(stats.latencies.items()):
+        ordered = sorted(latencies)
+        endpoints[endpoint] = {
+            "requests": len(ordered),
+            "errors": stats.errors[endpoint],
+            "error_rate": stats.errors[endpoint] / len(ordered),
+            "throughput_rps": len(ordered) / elapsed,
+            "statuses": {str(k): v for k, v in stats.statuses[endpoint].items()},
+            "latency_ms": {
+                "mean": sum(ordered) / len(ordered) * 1000,
+                "p50": percentile(ordered, 50) * 1000,
+                "p95": percentile(ordered, 95) * 1000,
+                "p99": percentile(ordered, 99) * 1000,
+                "max": ordered[-1] * 1000,
+            },
+        }
+    total = sum(row["requests"] for row in endpoints.values())
+    errors = sum(row["errors"] for row in endpoints.values())
+    return endpoints, {
+        "requests": total,
+        "errors": errors,
+        "error_rate": errors / total if total else 0.0,
+        "throughput_rps": total / elapsed,
+        "seconds": elapsed,
+    }
+
+
+def p95s(endpoints):
+    return {endpoint: row["latency_ms"]["p95"] for endpoint, row in endpoints.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=100,
+                        help="number of seeded users to log in as (seed_load_data --users)")
+    parser.add_argument("--prefix", default="load")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--mix", default=MIX,
+                        help="scenario weights, e.g. dashboard=5,settlement=4,create_event=1")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per request, seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="load_test.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p95 ratio above which --compare reports a regression")
+    args = parser.parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    stats, elapsed = asyncio.run(run_load(args))
+    endpoints, total = summarize(stats, elapsed)
+    for endpoint, row in endpoints.items():
+        latency = row["latency_ms"]
+        print(
+            f"{endpoint:>14} {row['requests']:>7} req {row['throughput_rps']:8.1f}/s  "
+            f"p50 {latency['p50']:8.1f}  p95 {latency['p95']:8.1f}  p99 {latency['p99']:8.1f} ms  "
+            f"errors {row['error_rate']:6.1%}",
+            flush=True,
+        )
+    print(f"{'total':>14} {total['requests']:>7} req {total['throughput_rps']:8.1f}/s  "
+          f"errors {total['error_rate']:6.1%}")
+
+    report = {
+        "meta": report_meta(
+            url=args.url,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            mix=parse_mix(args.mix),
+            users=args.users,
+            seed=args.seed,
+        ),
+        "total": total,
+        "endpoints": endpoints,
+    }
+    write_report(args.output, report)
+
+    if args.compare:
+        baseline = p95s(load_report(args.compare)["endpoints"])
+        if compare(p95s(endpoints), baseline, args.threshold, label=lambda endpoint: f"{endpoint:>14}  p95"):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Micro-benchmarks for the settlement algorithms.
+
+    python benchmarks/settlement_bench.py                      # default grid
+    python benchmarks/settlement_bench.py --sizes 10 1000 --engines heap
+    python benchmarks/settlement_bench.py -o new.json --compare old.json
+
+For every engine x distribution x size it records the best wall time of
+``--repeat`` runs, the peak traced memory of one extra run (tracemalloc, so
+only Python-level allocations) and the number of transfers produced. Results
+are written as JSON; ``--compare`` prints the time ratio against an earlier
+file and exits with status 1 if anything got slower than ``--threshold``.
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import compare, load_report, report_meta, write_report  # noqa: E402
+from DividePayments import dividePay  # noqa: E402
+from events.settlement import equal_split, settle, settle_optimal  # noqa: E402
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+# --- synthetic inputs: list of (participant, paid cents) ---
+
+def uniform(n, rng):
+    return [(f"u{i}", rng.randint(0, 50_000)) for i in range(n)]
+
+
+def skewed(n, rng):
+    # a few people pay for most things
+    return [(f"u{i}", int(rng.paretovariate(1.2) * 1_000)) for i in range(n)]
+
+
+def one_big_payer(n, rng):
+    return [("u0", 100 * n * 2_500)] + [(f"u{i}", 0) for i in range(1, n)]
+
+
+def many_tiny_debts(n, rng):
+    # everybody is within a few cents of the mean
+    return [(f"u{i}", 10_000 + rng.randint(-5, 5)) for i in range(n)]
+
+
+DISTRIBUTIONS = {
+    "uniform": uniform,
+    "skewed": skewed,
+    "one-big-payer": one_big_payer,
+    "many-tiny-debts": many_tiny_debts,
+}
+
+
+# --- engines: take the paid list, return the number of transfers ---
+
+def run_divide_pay(paid):
+    return len(dividePay([(name, cents / 100) for name, cents in paid]))
+
+
+def run_heap(paid):
+    return len(settle(equal_split(paid)))
+
+
+def run_optimal(paid):
+    # exact solver within its default budget, greedy above it
+    return len(settle_optimal(equal_split(paid)).transfers)
+
+
+def run_numpy(paid):
+    import numpy as np
+
+    from events.batch_settlement import net_from_paid, settle_batch
+
+    event_ids = np.zeros(len(paid), dtype=np.int64)
+    user_ids = np.arange(len(paid))
+    net = net_from_paid(event_ids, np.fromiter((cents for _, cents in paid), dtype=np.int64, count=len(paid)))
+    return len(settle_batch(event_ids, user_ids, net).amount)
+
+
+ENGINES = {
+    "dividePay": run_divide_pay,
+    "heap": run_heap,
+    "optimal": run_optimal,
+    "numpy": run_numpy,
+}
+
+
+def measure(engine, paid, repeat):
+    engine(paid[:2])  # warm-up: lazy imports, first-call overhead
+    best = float("inf")
+    transfers = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        transfers = engine(paid)
+        best = min(best, time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    engine(paid)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak, "transfers": transfers}
+
+
+def result_key(row):
+    return row["engine"], row["distribution"], row["size"]
+
+
+def result_label(key):
+    engine, distribution, size = key
+    return f"{engine:>10} {distribution:>16} {size:>9}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--distributions", nargs="+", choices=DISTRIBUTIONS, default=list(DISTRIBUTIONS))
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", default="bench_settlement.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="time ratio above which --compare reports a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for distribution in args.distributions:
+        for size in args.sizes:
+            paid = DISTRIBUTIONS[distribution](size, random.Random(args.seed))
+            for engine in args.engines:
+                row = {"engine": engine, "distribution": distribution, "size": size}
+                row.update(measure(ENGINES[engine], paid, args.repeat))
+                results.append(row)
+                print(
+                    f"{engine:>10} {distribution:>16} {size:>9}  "
+                    f"{row['seconds'] * 1000:10.2f} ms  {row['peak_bytes'] / 1024:10.0f} KiB  "
+                    f"{row['transfers']:>8} transfers",
+                    flush=True,
+                )
+
+    report = {
+        "meta": report_meta(repeat=args.repeat, seed=args.seed),
+        "results": results,
+    }
+    write_report(args.output, report)
+
+    if args.compare:
+        baseline = {result_key(row): row["seconds"] for row in load_report(args.compare)["results"]}
+        current = {result_key(row): row["seconds"] for row in results}
+        if compare(current, baseline, args.threshold, label=result_label):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,5 +2,18 @@ from django.urls import path
 from . import views  # 👈 ВАЖЛИВО!
 
 urlpatterns = [
+    path('', views.events_list_api, name='events_list_api'),  # api/events/?cursor=...
     path('create/', views.create_event_api, name='create_event_api'),  # буде api/events/create/
-]
\ No newline at end of file
+    path('<int:event_id>/', views.event_detail_api, name='event_detail_api'),
+    path('<int:event_id>/balances/', views.event_balances_api, name='event_balances_api'),
+    path('<int:event_id>/settlement/', views.event_settlement_api, name='event_settlement_api'),
+    path('<int:event_id>/import/', views.import_transactions_api, name='import_transactions_api'),
+    path('<int:event_id>/export/', views.export_ledger_api, name='export_ledger_api'),
+    path('<int:event_id>/rebuild-balances/', views.rebuild_balances_api, name='rebuild_balances_api'),
+    path('<int:event_id>/analytics/', views.event_analytics_api, name='event_analytics_api'),
+    path('analytics/', views.user_analytics_api, name='user_analytics_api'),
+    path('search/', views.search_transactions_api, name='search_transactions_api'),
+    path('global-settlement/', views.global_settlement_api, name='global_settlement_api'),
+    path('global-settlement/jobs/', views.global_settlement_job_api, name='global_settlement_job_api'),
+    path('settlement-cache/', views.settlement_cache_stats_api, name='settlement_cache_stats_api'),
+]
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+# api/async/events/... - async twins of the read endpoints in api_urls.py
+urlpatterns = [
+    path('<int:event_id>/', async_views.event_detail_api, name='async_event_detail_api'),
+    path('<int:event_id>/balances/', async_views.event_balances_api, name='async_event_balances_api'),
+    path('<int:event_id>/settlement/', async_views.event_settlement_api, name='async_event_settlement_api'),
+]
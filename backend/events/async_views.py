@@ -0,0 +1,72 @@
+# events/async_views.py
+"""
+Async versions of the read-heavy event endpoints (mounted under api/async/events/).
+
+Same responses as the sync views in events.views, but the ORM and cache are
+used through their async API, so under ASGI a request waiting on the database
+does not hold a worker thread. The CPU part of settlement runs in the bounded
+pool from events.cache.settlement_executor(). ETag / Last-Modified handling
+(events.conditional) is the same as for the sync views.
+"""
+
+from django.views.decorators.http import require_GET
+
+from SplitFair.responses import JsonResponse
+
+from .balances import aevent_balances, ausernames
+from .cache import acached_event_settlement
+from .conditional import event_conditional, with_event_validators
+from .views import (
+    balances_payload, event_payload, participant_rows, settlement_payload,
+    transfer_user_ids, user_events,
+)
+
+
+async def _get_event(request, event_id):
+    """-> (event, error response)"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, JsonResponse({'error': 'Authentication required'}, status=401)
+    event = await user_events(user, event_id).afirst()
+    if event is None:
+        return None, JsonResponse({'error': 'Event not found'}, status=404)
+    return event, None
+
+
+@require_GET
+@event_conditional
+async def event_detail_api(request, event_id):
+    event, error = await _get_event(request, event_id)
+    if error:
+        return error
+
+    participants = [p async for p in participant_rows(event).aiterator()]
+    return with_event_validators(JsonResponse(event_payload(event, participants)), event)
+
+
+@require_GET
+@event_conditional
+async def event_balances_api(request, event_id):
+    event, error = await _get_event(request, event_id)
+    if error:
+        return error
+
+    balances = await aevent_balances(event.id)
+    names = await ausernames(balances)
+    return with_event_validators(JsonResponse(balances_payload(event, balances, names)), event)
+
+
+@require_GET
+@event_conditional
+async def event_settlement_api(request, event_id):
+    event, error = await _get_event(request, event_id)
+    if error:
+        return error
+
+    try:
+        plan = await acached_event_settlement(event.id, event.version)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=409)
+
+    names = await ausernames(transfer_user_ids(plan.transfers))
+    return with_event_validators(JsonResponse(settlement_payload(event, plan, names)), event)
@@ -0,0 +1,137 @@
+# events/balance_sheet.py
+"""
+Compact per-participant balances.
+
+A ``BalanceSheet`` keeps participant ids and net amounts (integer cents) in two
+``array('q')`` buffers - 16 bytes per participant instead of a tuple, a boxed
+int and a float each. Participants that are not integers (names in
+``DividePayments.py``) go into an optional ``labels`` list and ``ids`` holds
+their positions.
+
+Indexing or iterating gives ``BalanceRecord`` views into the buffers; a record
+unpacks like the ``(participant, cents)`` pair the settlement functions take,
+so a sheet can be passed anywhere a list of pairs was. ``items()`` yields plain
+pairs for hot loops. ``as_numpy()`` exposes the buffers as int64 arrays without
+copying (events.batch_settlement), and sheets pickle as two byte buffers, which
+keeps process-pool handoff cheap.
+
+No Django imports, same as events.settlement.
+"""
+
+from array import array
+
+
+class BalanceRecord:
+    """View of one row of a ``BalanceSheet``; unpacks as ``(who, cents)``."""
+
+    __slots__ = ("sheet", "index")
+
+    def __init__(self, sheet, index):
+        self.sheet = sheet
+        self.index = index
+
+    @property
+    def who(self):
+        return self.sheet.who(self.index)
+
+    @property
+    def cents(self):
+        return self.sheet.cents[self.index]
+
+    def __iter__(self):
+        yield self.who
+        yield self.cents
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"BalanceRecord({self.who!r}, {self.cents})"
+
+
+class BalanceSheet:
+    __slots__ = ("ids", "cents", "labels")
+
+    def __init__(self, ids=None, cents=None, labels=None):
+        self.ids = ids if isinstance(ids, array) else array("q", ids or ())
+        self.cents = cents if isinstance(cents, array) else array("q", cents or ())
+        if len(self.ids) != len(self.cents):
+            raise ValueError("ids and cents must have the same length")
+        self.labels = labels
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """From ``(participant, cents)`` pairs; non-int participants become labels."""
+        sheet = cls()
+        for who, cents in pairs:
+            sheet.append(who, cents)
+        return sheet
+
+    @classmethod
+    def from_dict(cls, balances):
+        """From ``{participant: cents}``, sorted by participant."""
+        return cls.from_pairs(sorted(balances.items()))
+
+    @classmethod
+    def from_numpy(cls, ids, cents):
+        return cls(array("q", ids.astype("int64").tobytes()), array("q", cents.astype("int64").tobytes()))
+
+    def append(self, who, cents):
+        if self.labels is None and not isinstance(who, int):
+            if self.ids:
+                # switch to labels: existing integer ids become labels too
+                self.labels = list(self.ids)
+                self.ids = array("q", range(len(self.labels)))
+            else:
+                self.labels = []
+        if self.labels is not None:
+            self.ids.append(len(self.labels))
+            self.labels.append(who)
+        else:
+            self.ids.append(who)
+        self.cents.append(cents)
+
+    def who(self, index):
+        if self.labels is not None:
+            return self.labels[self.ids[index]]
+        return self.ids[index]
+
+    def __len__(self):
+        return len(self.cents)
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError("BalanceSheet index out of range")
+        return BalanceRecord(self, index % len(self))
+
+    def __iter__(self):
+        return (BalanceRecord(self, i) for i in range(len(self)))
+
+    def items(self):
+        """``(participant, cents)`` tuples, like ``dict.items()``."""
+        if self.labels is not None:
+            labels = self.labels
+            return ((labels[i], c) for i, c in zip(self.ids, self.cents))
+        return zip(self.ids, self.cents)
+
+    def as_dict(self):
+        return dict(self.items())
+
+    def total(self):
+        return sum(self.cents)
+
+    def as_numpy(self):
+        """
+        ``(ids, cents)`` as int64 NumPy arrays sharing this sheet's memory. The
+        sheet cannot grow while the arrays are alive (BufferError).
+        """
+        import numpy as np
+
+        return np.frombuffer(self.ids, dtype=np.int64), np.frombuffer(self.cents, dtype=np.int64)
+
+    @property
+    def nbytes(self):
+        return (len(self.ids) + len(self.cents)) * self.cents.itemsize
+
+    def __repr__(self):
+        return f"BalanceSheet({list(self.items())!r})"
@@ -0,0 +1,129 @@
+# events/balances.py
+"""
+Event balance service.
+
+Net position of a participant = everything they paid (``Transaction.payer``)
+minus everything they owe (``TransactionSplit.share_amount``).
+
+Reads go to the ParticipantBalance ledger (one indexed query per event).
+``aggregate_balances`` recomputes the same numbers from the transaction tables
+with GROUP BY queries; it backs ``manage.py rebuild_balances``.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+
+from .balance_sheet import BalanceSheet
+from .models import ParticipantBalance, Transaction, TransactionSplit
+from .settlement import EXACT_MAX_PARTICIPANTS, EXACT_TIME_BUDGET, settle_optimal, to_cents
+
+User = get_user_model()
+
+ZERO = Decimal("0.00")
+
+
+def aggregate_balances(event_ids=None):
+    """
+    ``{(event_id, user_id): [paid, owed]}`` summed straight from Transaction /
+    TransactionSplit - two queries for any number of events and transactions.
+    ``event_ids=None`` means all events.
+    """
+    payments = Transaction.objects.filter(payer__isnull=False)
+    shares = TransactionSplit.objects.all()
+    if event_ids is not None:
+        payments = payments.filter(event_id__in=event_ids)
+        shares = shares.filter(transaction__event_id__in=event_ids)
+
+    paid = (
+        payments.values("event", "payer")
+        .annotate(total=Sum("amount"))
+        .values_list("event", "payer", "total")
+    )
+    owed = (
+        shares.values("transaction__event", "user")
+        .annotate(total=Sum("share_amount"))
+        .values_list("transaction__event", "user", "total")
+    )
+
+    totals = {}
+    for event_id, user_id, total in paid:
+        totals[event_id, user_id] = [total, ZERO]
+    for event_id, user_id, total in owed:
+        totals.setdefault((event_id, user_id), [ZERO, ZERO])[1] = total
+    return totals
+
+
+def compute_event_balances(event_id):
+    """Same as ``event_balances`` but recomputed from the transaction tables."""
+    return {
+        user_id: to_cents(paid) - to_cents(owed)
+        for (_, user_id), (paid, owed) in aggregate_balances([event_id]).items()
+    }
+
+
+def event_balances(event_id):
+    """Returns ``{user_id: net_cents}`` for every user with activity in the event."""
+    rows = ParticipantBalance.objects.filter(event_id=event_id).values_list("user_id", "paid", "owed")
+    return {user_id: to_cents(paid) - to_cents(owed) for user_id, paid, owed in rows}
+
+
+async def aevent_balances(event_id):
+    rows = ParticipantBalance.objects.filter(event_id=event_id).values_list("user_id", "paid", "owed")
+    # plain ``async for``: ValuesListIterable.aiterator() runs the query in the
+    # event loop thread for renamed fields on Django 5.0
+    return {user_id: to_cents(paid) - to_cents(owed) async for user_id, paid, owed in rows}
+
+
+def _sheet_rows(event_id):
+    return (
+        ParticipantBalance.objects.filter(event_id=event_id)
+        .order_by("user_id")
+        .values_list("user_id", "paid", "owed")
+    )
+
+
+def event_balance_sheet(event_id):
+    """The event's balances as a ``BalanceSheet`` sorted by user id (settlement input)."""
+    sheet = BalanceSheet()
+    for user_id, paid, owed in _sheet_rows(event_id):
+        sheet.append(user_id, to_cents(paid) - to_cents(owed))
+    return sheet
+
+
+async def aevent_balance_sheet(event_id):
+    sheet = BalanceSheet()
+    async for user_id, paid, owed in _sheet_rows(event_id):
+        sheet.append(user_id, to_cents(paid) - to_cents(owed))
+    return sheet
+
+
+def plan_settlement(balances):
+    """
+    ``SettlementPlan`` for a ``BalanceSheet`` or ``{user_id: net_cents}``: the
+    exact minimum-transfers solver within ``SETTLEMENT_EXACT_MAX_PARTICIPANTS``
+    / ``SETTLEMENT_EXACT_TIME_BUDGET``, the heap greedy beyond that.
+    """
+    if not isinstance(balances, BalanceSheet):
+        balances = BalanceSheet.from_dict(balances)
+    return settle_optimal(
+        balances,
+        max_participants=getattr(settings, "SETTLEMENT_EXACT_MAX_PARTICIPANTS", EXACT_MAX_PARTICIPANTS),
+        time_budget=getattr(settings, "SETTLEMENT_EXACT_TIME_BUDGET", EXACT_TIME_BUDGET),
+    )
+
+
+def event_settlement(event_id):
+    """``SettlementPlan`` for the event's current balances."""
+    return plan_settlement(event_balance_sheet(event_id))
+
+
+def usernames(user_ids):
+    return dict(User.objects.filter(id__in=set(user_ids)).values_list("id", "username"))
+
+
+async def ausernames(user_ids):
+    rows = User.objects.filter(id__in=set(user_ids)).values_list("id", "username")
+    return {user_id: username async for user_id, username in rows}
@@ -0,0 +1,118 @@
+# events/cache.py
+"""
+Settlement-plan cache.
+
+Plans (``SettlementPlan``) are stored under
+``settlement-plan:<event id>:<event version>``. Any change to
+an event's transactions or participants bumps ``Event.version`` (see
+events.signals), so old entries are never read again and simply age out of the
+cache - no explicit invalidation needed. On a miss the plan is taken from the
+event's incremental planner (events.planner) when that is up to date, and
+computed from the ledger otherwise.
+
+The cache alias comes from ``settings.SETTLEMENT_CACHE_ALIAS``. The default
+config is a size-bounded LocMemCache (LRU), any Django cache backend works.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from . import planner
+from .balances import aevent_balance_sheet, event_balance_sheet, plan_settlement
+from .models import Event
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Hit/miss counters of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def settlement_cache():
+    return caches[getattr(settings, "SETTLEMENT_CACHE_ALIAS", "default")]
+
+
+def plan_key(event_id, version):
+    return f"settlement-plan:{event_id}:{version}"
+
+
+def bump_event_version(*event_ids):
+    event_ids = [pk for pk in event_ids if pk is not None]
+    if event_ids:
+        Event.objects.filter(pk__in=event_ids).update(version=F("version") + 1, updated_at=timezone.now())
+        planner.record_bump(event_ids)
+
+
+def cached_event_settlement(event_id, version=None):
+    """Same as ``balances.event_settlement`` but served from the cache when possible."""
+    if version is None:
+        version = Event.objects.values_list("version", flat=True).get(pk=event_id)
+
+    cache = settlement_cache()
+    key = plan_key(event_id, version)
+    plan = cache.get(key)
+    if plan is not None:
+        _count("hits")
+        return plan
+
+    _count("misses")
+    plan = planner.current_plan(event_id, version)
+    if plan is None:
+        balances = event_balance_sheet(event_id)
+        plan = plan_settlement(balances)
+        planner.seed(event_id, version, balances, plan)
+    cache.set(key, plan)
+    return plan
+
+
+def settlement_executor():
+    """
+    Bounded thread pool for settlement work started from async views, so a
+    burst of cache misses cannot starve the event loop or spawn unbounded
+    threads. Size: ``settings.SETTLEMENT_THREAD_POOL_SIZE``.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "SETTLEMENT_THREAD_POOL_SIZE", 4),
+                thread_name_prefix="settlement",
+            )
+        return _executor
+
+
+async def acached_event_settlement(event_id, version):
+    """Async ``cached_event_settlement``: async ORM/cache I/O, solving in the pool."""
+    cache = settlement_cache()
+    key = plan_key(event_id, version)
+    plan = await cache.aget(key)
+    if plan is not None:
+        _count("hits")
+        return plan
+
+    _count("misses")
+    plan = planner.current_plan(event_id, version)
+    if plan is None:
+        balances = await aevent_balance_sheet(event_id)
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(settlement_executor(), plan_settlement, balances)
+        planner.seed(event_id, version, balances, plan)
+    await cache.aset(key, plan)
+    return plan
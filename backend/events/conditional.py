@@ -0,0 +1,98 @@
+# events/conditional.py
+"""
+Conditional GET for per-event read endpoints.
+
+The validators come from ``Event.version`` (bumped on every transaction /
+participant change) and ``Event.updated_at``:
+
+    ETag: "<event id>-<version>-<updated_at in µs>"
+    Last-Modified: updated_at
+
+Both are read in one indexed lookup that also checks the user may see the
+event. If the client's ``If-None-Match`` / ``If-Modified-Since`` still match,
+the view is not called at all and a 304 goes back; otherwise the view runs and
+the headers are added to its 200 response. Views wrap their response in
+``with_event_validators`` so the headers describe the event row the body was
+built from, not the (possibly older) one read here.
+
+HTTP dates have whole seconds. A response built in the same second as
+``updated_at`` gets no Last-Modified: a second change within that second would
+keep the date and let ``If-Modified-Since`` answer 304 with stale data. Once
+the second is over, any later change has a later date.
+"""
+
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Event
+
+
+def _validators(user, event_id):
+    return (
+        Event.objects.filter(pk=event_id)
+        .filter(Q(owner=user) | Q(participants__user=user))
+        .values_list('version', 'updated_at')
+    )
+
+
+def _headers(event_id, row):
+    """-> (ETag, Last-Modified timestamp or None while updated_at's second lasts)"""
+    version, updated_at = row
+    etag = f'"{event_id}-{version}-{int(updated_at.timestamp() * 1_000_000)}"'
+    last_modified = int(updated_at.timestamp())
+    return etag, (last_modified if time.time() >= last_modified + 1 else None)
+
+
+def _finish(response, etag, last_modified):
+    if response.status_code == 200:
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    return response
+
+
+def with_event_validators(response, event):
+    """Set ETag / Last-Modified of ``response`` from the ``event`` its body was built from."""
+    if response.status_code == 200:
+        etag, last_modified = _headers(event.id, (event.version, event.updated_at))
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def event_conditional(view):
+    """
+    Decorator for sync or async views taking ``event_id``. Anonymous users and
+    unknown events go straight to the view, which produces the error.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _wrapped(request, event_id, *args, **kwargs):
+            user = await request.auser()
+            row = await _validators(user, event_id).afirst() if user.is_authenticated else None
+            if row is None:
+                return await view(request, event_id, *args, **kwargs)
+            etag, last_modified = _headers(event_id, row)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+            return _finish(await view(request, event_id, *args, **kwargs), etag, last_modified)
+    else:
+        @wraps(view)
+        def _wrapped(request, event_id, *args, **kwargs):
+            user = request.user
+            row = _validators(user, event_id).first() if user.is_authenticated else None
+            if row is None:
+                return view(request, event_id, *args, **kwargs)
+            etag, last_modified = _headers(event_id, row)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+            return _finish(view(request, event_id, *args, **kwargs), etag, last_modified)
+    return _wrapped
@@ -0,0 +1,66 @@
+# events/counters.py
+"""
+Denormalized per-event counters: ``Event.participants_count`` (owner not
+included), ``transactions_count`` and ``total_amount``.
+
+Every write path adds its delta with one F() UPDATE on the event row, inside
+the same DB transaction as the write itself: events.signals for single rows,
+the importer once per chunk. ``add_participants`` inserts with
+``ignore_conflicts`` and cannot know how many rows were new, so it recounts
+the event's participants in the UPDATE instead (``recount_participants``).
+
+List endpoints read the columns and never join or aggregate
+(events.listing). ``manage.py rebuild_event_counters`` compares them with
+``aggregate_counters`` and repairs drift.
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Event, EventParticipant, Transaction
+from .settlement import CENT
+
+
+def apply_event_counters(event_id, participants=0, transactions=0, amount=0):
+    """Add the deltas to the event's counters (no-op for a deleted event)."""
+    changes = {}
+    if participants:
+        changes['participants_count'] = F('participants_count') + participants
+    if transactions:
+        changes['transactions_count'] = F('transactions_count') + transactions
+    if amount:
+        changes['total_amount'] = F('total_amount') + amount
+    if event_id is not None and changes:
+        Event.objects.filter(pk=event_id).update(**changes)
+
+
+def recount_participants(event_id):
+    count = (
+        EventParticipant.objects.filter(event=OuterRef('pk')).order_by().values('event')
+        .annotate(n=Count('*')).values('n')
+    )
+    Event.objects.filter(pk=event_id).update(
+        participants_count=Coalesce(Subquery(count, output_field=IntegerField()), 0),
+    )
+
+
+def aggregate_counters(event_ids=None):
+    """
+    ``{event_id: (participants, transactions, total_amount)}`` counted from
+    EventParticipant / Transaction - two GROUP BY queries. Events without
+    rows are missing from the result.
+    """
+    participants = EventParticipant.objects.all()
+    transactions = Transaction.objects.all()
+    if event_ids is not None:
+        participants = participants.filter(event_id__in=event_ids)
+        transactions = transactions.filter(event_id__in=event_ids)
+
+    counters = {
+        event_id: (n, 0, 0)
+        for event_id, n in participants.values('event').annotate(n=Count('*')).values_list('event', 'n').order_by()
+    }
+    rows = transactions.values('event').annotate(n=Count('*'), total=Sum('amount')).values_list('event', 'n', 'total')
+    for event_id, n, total in rows.order_by():
+        counters[event_id] = (counters.get(event_id, (0,))[0], n, total.quantize(CENT))
+    return counters
@@ -0,0 +1,97 @@
+# events/exporter.py
+"""
+Streaming ledger export (CSV or JSON Lines) for StreamingHttpResponse.
+
+Rows are produced lazily from ``QuerySet.iterator()``, so memory stays flat
+and the header goes out before the first query runs.
+
+CSV layout (one header, ``record`` tells the row type)::
+
+    record,transaction,date,payer,user,amount,description
+    transaction,12,2025-11-02,anna,,30.00,Dinner
+    split,12,,,john,20.00,
+    transfer,,,anna,john,20.00,        <- optional settlement: user pays payer
+"""
+
+import csv
+
+from SplitFair.responses import dumps
+
+from .balances import usernames
+from .cache import cached_event_settlement
+from .models import Transaction, TransactionSplit
+from .settlement import format_cents
+
+FORMATS = ('csv', 'jsonl')
+CSV_HEADER = ('record', 'transaction', 'date', 'payer', 'user', 'amount', 'description')
+CHUNK_SIZE = 2000
+
+
+def iter_records(event, include_settlement=False, chunk_size=CHUNK_SIZE):
+    """Yields one dict per transaction, split and (optionally) settlement transfer."""
+    transactions = (
+        Transaction.objects.filter(event=event)
+        .order_by('id')
+        .values_list('id', 'date', 'amount', 'description', 'payer__username')
+    )
+    for transaction_id, day, amount, description, payer in transactions.iterator(chunk_size=chunk_size):
+        yield {
+            'record': 'transaction',
+            'transaction': transaction_id,
+            'date': day.isoformat(),
+            'payer': payer,
+            'amount': str(amount),
+            'description': description,
+        }
+
+    splits = (
+        TransactionSplit.objects.filter(transaction__event=event)
+        .order_by('transaction_id', 'id')
+        .values_list('transaction_id', 'user__username', 'share_amount')
+    )
+    for transaction_id, username, share in splits.iterator(chunk_size=chunk_size):
+        yield {'record': 'split', 'transaction': transaction_id, 'user': username, 'amount': str(share)}
+
+    if include_settlement:
+        try:
+            transfers = cached_event_settlement(event.id).transfers
+        except ValueError as e:
+            # headers are long gone, report it in-band
+            yield {'record': 'error', 'description': str(e)}
+            return
+        names = usernames([u for t in transfers for u in (t.debtor, t.creditor)])
+        for t in transfers:
+            yield {
+                'record': 'transfer',
+                'payer': names.get(t.creditor),
+                'user': names.get(t.debtor),
+                'amount': format_cents(t.amount),
+            }
+
+
+class _Echo:
+    """File-like object for csv.writer that just hands the line back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for record in records:
+        yield writer.writerow([record.get(column) or '' for column in CSV_HEADER])
+
+
+def stream_jsonl(records):
+    for record in records:
+        yield dumps(record) + b'\n'
+
+
+def stream_export(event, fmt='csv', include_settlement=False):
+    records = iter_records(event, include_settlement=include_settlement)
+    if fmt == 'csv':
+        return stream_csv(records)
+    if fmt == 'jsonl':
+        return stream_jsonl(records)
+    raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
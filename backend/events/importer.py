@@ -0,0 +1,249 @@
+# events/importer.py
+"""
+Streaming import of transactions from CSV or JSON Lines.
+
+CSV columns (header row required)::
+
+    payer,amount,description,splits
+    anna,30.00,Dinner,anna:10.00;john:20.00
+    john,12.50,Taxi,
+
+JSON Lines, one object per line::
+
+    {"payer": "anna", "amount": "30.00", "description": "Dinner",
+     "splits": {"anna": "10.00", "john": "20.00"}}
+
+``splits`` is optional; without it the amount is split equally between the
+event owner and all participants. Usernames must belong to the event.
+
+The input is read one row at a time and written in chunks with bulk_create, so
+memory use does not depend on the file size. Each chunk commits on its own;
+``on_chunk`` is called inside that transaction, and a ``progress()`` saved
+there lets a retry continue after the committed rows (``resume``) instead of
+importing them twice.
+"""
+
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .cache import bump_event_version
+from .counters import apply_event_counters
+from .ledger import apply_balance_deltas
+from .models import EventParticipant, Transaction, TransactionSplit
+from .rollups import apply_rollup_deltas
+from .settlement import CENT, to_cents
+
+FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), first MAX_REPORTED_ERRORS only
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.created + self.rejected) / self.seconds if self.seconds else 0.0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'rejected': self.rejected,
+            'errors': [{'line': line, 'error': message} for line, message in self.errors],
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def guess_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def iter_raw_rows(stream, fmt):
+    """Yields ``(line number, dict)``; ``stream`` is a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"invalid JSON: {e}")
+                continue
+            yield line_no, row if isinstance(row, dict) else RowError("expected a JSON object")
+    else:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+
+MAX_AMOUNT = Decimal(10) ** 10  # Transaction.amount has max_digits=12
+
+
+def _amount(value, what):
+    try:
+        amount = Decimal(str(value).strip())
+        exact = amount.is_finite() and abs(amount) < MAX_AMOUNT and amount == amount.quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise RowError(f"{what} is not a number: {value!r}")
+    if not exact:
+        raise RowError(f"{what} must be below {MAX_AMOUNT} with at most 2 decimal places: {value!r}")
+    return amount
+
+
+def _parse_splits(raw):
+    """CSV "anna:10;john:20" or a JSON object -> {username: value}."""
+    if raw in (None, ''):
+        return None
+    if isinstance(raw, dict):
+        return raw
+    splits = {}
+    for part in str(raw).split(';'):
+        if not part.strip():
+            continue
+        name, sep, value = part.rpartition(':')
+        if not sep or not name.strip():
+            raise RowError(f"bad split {part!r}, expected user:amount")
+        splits[name.strip()] = value
+    return splits
+
+
+class TransactionImporter:
+    def __init__(self, event, chunk_size=1000, on_chunk=None):
+        self.event = event
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk  # on_chunk(importer), in each chunk's transaction
+        self.line = 0  # last input line handled, rows up to here are written or rejected
+        members = EventParticipant.objects.filter(event=event).values_list('user__username', 'user_id')
+        self.members = dict(members)
+        self.members.setdefault(event.owner.username, event.owner_id)
+        self.result = ImportResult()
+
+    def parse(self, row):
+        """Validate one raw row -> (payer id, amount, description, {user id: share})."""
+        payer = str(row.get('payer') or '').strip()
+        if payer not in self.members:
+            raise RowError(f"payer {payer!r} is not a participant of the event")
+        amount = _amount(row.get('amount'), 'amount')
+        if amount <= 0:
+            raise RowError("amount must be positive")
+        description = str(row.get('description') or '')
+
+        splits = _parse_splits(row.get('splits'))
+        if splits is None:
+            # equal shares, leftover cents go to the first members
+            share, extra = divmod(to_cents(amount), len(self.members))
+            shares = {
+                user_id: (share + (1 if idx < extra else 0)) * CENT
+                for idx, user_id in enumerate(self.members.values())
+            }
+        else:
+            shares = {}
+            for name, value in splits.items():
+                name = str(name).strip()
+                if name not in self.members:
+                    raise RowError(f"split user {name!r} is not a participant of the event")
+                shares[self.members[name]] = shares.get(self.members[name], 0) + _amount(value, f"share of {name}")
+            if sum(shares.values()) != amount:
+                raise RowError(f"splits add up to {sum(shares.values())}, amount is {amount}")
+        return self.members[payer], amount, description, shares
+
+    def progress(self):
+        """JSON-serializable state after the last written chunk, for ``resume``."""
+        return {
+            'line': self.line,
+            'created': self.result.created,
+            'rejected': self.result.rejected,
+            'errors': list(self.result.errors),
+        }
+
+    def resume(self, progress):
+        """Skip the input lines covered by ``progress`` and continue its counts."""
+        self.line = progress['line']
+        self.result.created = progress['created']
+        self.result.rejected = progress['rejected']
+        self.result.errors = [tuple(error) for error in progress['errors']]
+
+    def run(self, stream, fmt):
+        started = time.perf_counter()
+        resume_after = self.line
+        chunk = []
+        for line_no, row in iter_raw_rows(stream, fmt):
+            if line_no <= resume_after:
+                continue
+            self.line = line_no
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                chunk.append(self.parse(row))
+            except RowError as e:
+                self.result.reject(line_no, str(e))
+                continue
+            if len(chunk) >= self.chunk_size:
+                self._write(chunk)
+                chunk = []
+        if chunk:
+            self._write(chunk)
+        self.result.seconds = time.perf_counter() - started
+        return self.result
+
+    def _write(self, rows):
+        with transaction.atomic():
+            created = Transaction.objects.bulk_create([
+                Transaction(event=self.event, payer_id=payer_id, amount=amount, description=description)
+                for payer_id, amount, description, _ in rows
+            ])
+            TransactionSplit.objects.bulk_create([
+                TransactionSplit(transaction_id=obj.pk, user_id=user_id, share_amount=share)
+                for obj, (_, _, _, shares) in zip(created, rows)
+                for user_id, share in shares.items()
+            ], batch_size=self.chunk_size)
+
+            # bulk_create sends no signals, keep ledger, rollups and counters in sync here
+            deltas = {}
+            for payer_id, amount, _, shares in rows:
+                paid, owed = deltas.get(payer_id, (0, 0))
+                deltas[payer_id] = (paid + amount, owed)
+                for user_id, share in shares.items():
+                    paid, owed = deltas.get(user_id, (0, 0))
+                    deltas[user_id] = (paid, owed + share)
+            apply_balance_deltas(self.event.id, deltas)
+
+            days = {}
+            for obj in created:
+                amount, count = days.get((obj.payer_id, obj.date), (0, 0))
+                days[obj.payer_id, obj.date] = (amount + obj.amount, count + 1)
+            apply_rollup_deltas(self.event.id, days)
+            apply_event_counters(
+                self.event.id, transactions=len(created), amount=sum(obj.amount for obj in created),
+            )
+            # per chunk: an import that fails later still invalidates caches and ETags
+            bump_event_version(self.event.id)
+            self.result.created += len(rows)
+            if self.on_chunk is not None:
+                self.on_chunk(self)
+
+
+def import_transactions(event, stream, fmt='csv', chunk_size=1000, on_chunk=None, progress=None):
+    importer = TransactionImporter(event, chunk_size=chunk_size, on_chunk=on_chunk)
+    if progress:
+        importer.resume(progress)
+    return importer.run(stream, fmt)
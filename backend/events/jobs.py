@@ -0,0 +1,62 @@
+# events/jobs.py
+"""
+Background job handlers of the events app (see jobs.queue). Imported from
+EventsConfig.ready() so the handlers are registered in web and worker processes.
+"""
+
+import io
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import is_last_attempt, register
+
+from .importer import import_transactions
+from .models import Event
+from .views import global_settlement_payload
+
+
+@register('events.import_transactions')
+def import_transactions_job(job):
+    path = job.payload['path']
+    done = False
+
+    def save_progress(importer):
+        # committed with the chunk, so a retry neither skips nor repeats rows
+        job.payload['progress'] = importer.progress()
+        Job.objects.filter(pk=job.pk).update(payload=job.payload, locked_at=timezone.now())
+
+    try:
+        event = Event.objects.select_related('owner').get(pk=job.payload['event_id'])
+        with open(path, encoding='utf-8', newline='') as stream:
+            result = import_transactions(
+                event, stream, job.payload['format'],
+                on_chunk=save_progress, progress=job.payload.get('progress'),
+            )
+        done = True
+        return result.as_dict()
+    finally:
+        # the upload is needed again if the job will be retried
+        if done or is_last_attempt(job):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+@register('events.rebuild_balances')
+def rebuild_balances_job(job):
+    out = io.StringIO()
+    call_command('rebuild_balances', events=job.payload['event_ids'], stdout=out)
+    return {'output': out.getvalue().strip()}
+
+
+@register('events.global_settlement')
+def global_settlement_job(job):
+    user = get_user_model().objects.get(pk=job.payload['user_id'])
+    return global_settlement_payload(
+        user, mine=job.payload.get('mine', False), trace_all=job.payload.get('trace_all', False),
+    )
@@ -0,0 +1,45 @@
+# events/ledger.py
+"""
+Write side of the ParticipantBalance ledger.
+
+Every change is applied as ``paid = paid + x`` / ``owed = owed + x`` with F()
+expressions, so concurrent writers never overwrite each other. The same
+delta goes to the event's settlement planner (events.planner) on commit.
+"""
+
+from django.db import transaction
+from django.db.models import F
+
+from . import planner
+from .models import ParticipantBalance
+from .settlement import to_cents
+
+
+def apply_balance_delta(event_id, user_id, paid=0, owed=0, create=True):
+    """
+    Add ``paid``/``owed`` (Decimal) to the (event, user) row.
+
+    With ``create=False`` a missing row is left alone - used on deletes,
+    where the row may already be gone together with its event.
+    """
+    if user_id is None or (not paid and not owed):
+        return
+    planner.record_delta(event_id, {user_id: to_cents(paid) - to_cents(owed)})
+
+    rows = ParticipantBalance.objects.filter(event_id=event_id, user_id=user_id)
+    with transaction.atomic():
+        if rows.update(paid=F('paid') + paid, owed=F('owed') + owed) or not create:
+            return
+        _, created = ParticipantBalance.objects.get_or_create(
+            event_id=event_id, user_id=user_id,
+            defaults={'paid': paid, 'owed': owed},
+        )
+        if not created:
+            # somebody else created it in between
+            rows.update(paid=F('paid') + paid, owed=F('owed') + owed)
+
+
+def apply_balance_deltas(event_id, deltas):
+    """Bulk variant: ``deltas`` is ``{user_id: (paid, owed)}``."""
+    for user_id, (paid, owed) in deltas.items():
+        apply_balance_delta(event_id, user_id, paid=paid, owed=owed)
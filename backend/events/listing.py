@@ -0,0 +1,67 @@
+# events/listing.py
+"""
+Keyset-paginated list of a user's events (dashboard and api/events/).
+
+Pages are ordered by (created_at, id) descending and the cursor is the last
+row's (created_at, id), so every page is an index range scan on
+event_owner_created_idx instead of an OFFSET that gets slower the deeper you go.
+Counts and totals are the Event's own counter columns (events.counters), so a
+page is one query without joins or aggregates.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+from .models import Event
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(event):
+    raw = f"{event.created_at.isoformat()}|{event.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """-> (created_at, id); raises ValueError on garbage."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def parse_limit(limit):
+    """``limit`` (int or query string value) as an int >= 1; raises ValueError otherwise."""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return limit
+
+
+def owned_events_page(user, cursor=None, limit=PAGE_SIZE):
+    """
+    Returns ``(events, next_cursor)``; ``next_cursor`` is None on the last page.
+    Raises ValueError for a bad cursor or limit.
+    """
+    limit = min(parse_limit(limit), MAX_PAGE_SIZE)
+    events = Event.objects.filter(owner=user).order_by("-created_at", "-id")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        events = events.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+            created_at__lte=created_at,
+        )
+
+    rows = list(events[: limit + 1])
+    for event in rows:
+        event.owner = user  # all the user's own, no join needed
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from events.importer import FORMATS, guess_format, import_transactions
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = "Stream-import transactions for one event from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("event_id", type=int)
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=FORMATS,
+                            help="Input format. Default: guessed from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            event = Event.objects.select_related("owner").get(pk=options["event_id"])
+        except Event.DoesNotExist:
+            raise CommandError(f"Event {options['event_id']} does not exist")
+
+        fmt = options["format"] or guess_format(options["path"])
+        with open(options["path"], encoding="utf-8", newline="") as stream:
+            result = import_transactions(event, stream, fmt, chunk_size=options["chunk_size"])
+
+        for line, message in result.errors:
+            self.stderr.write(f"line {line}: {message}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(f"... and {result.rejected - len(result.errors)} more")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} transaction(s), rejected {result.rejected} row(s) "
+            f"in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        ))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from events.balances import aggregate_balances
+from events.models import Event, ParticipantBalance
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or with --verify, check) the ParticipantBalance ledger from transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", type=int, action="append", dest="events",
+                            help="Only this event id (can be repeated). Default: all events.")
+        parser.add_argument("--verify", action="store_true",
+                            help="Only compare the ledger with the transactions, do not write.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        event_ids = options["events"]
+        if options["verify"]:
+            self._verify(aggregate_balances(event_ids), self._stored(event_ids))
+        else:
+            self._rebuild(event_ids, options["batch_size"])
+
+    def _stored(self, event_ids):
+        stored = ParticipantBalance.objects.all()
+        if event_ids is not None:
+            stored = stored.filter(event_id__in=event_ids)
+        return {
+            (event_id, user_id): [paid, owed]
+            for event_id, user_id, paid, owed in stored.values_list("event_id", "user_id", "paid", "owed")
+        }
+
+    def _verify(self, expected, actual):
+        mismatches = 0
+        for key in sorted(expected.keys() | actual.keys()):
+            want = expected.get(key, [0, 0])
+            have = actual.get(key, [0, 0])
+            if want[0] != have[0] or want[1] != have[1]:
+                mismatches += 1
+                self.stdout.write(
+                    f"event {key[0]} user {key[1]}: ledger paid={have[0]} owed={have[1]}, "
+                    f"expected paid={want[0]} owed={want[1]}"
+                )
+        if mismatches:
+            raise CommandError(f"{mismatches} balance row(s) out of sync, run without --verify to repair")
+        self.stdout.write(self.style.SUCCESS(f"Ledger OK ({len(expected)} rows)"))
+
+    def _rebuild(self, event_ids, batch_size):
+        with transaction.atomic():
+            events = Event.objects.all() if event_ids is None else Event.objects.filter(pk__in=event_ids)
+            # lock the events first: a write that lands after this waits, one
+            # that landed before is in the aggregate
+            list(events.select_for_update().values_list("pk"))
+            expected = aggregate_balances(event_ids)
+            rows = [
+                ParticipantBalance(event_id=event_id, user_id=user_id, paid=paid, owed=owed)
+                for (event_id, user_id), (paid, owed) in expected.items()
+            ]
+            stale = ParticipantBalance.objects.all()
+            if event_ids is not None:
+                stale = stale.filter(event_id__in=event_ids)
+            stale.delete()
+            ParticipantBalance.objects.bulk_create(rows, batch_size=batch_size)
+            # cached plans and planners were built from the old rows
+            events.update(version=F("version") + 1, updated_at=timezone.now())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} balance row(s)"))
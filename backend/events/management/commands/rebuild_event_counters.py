@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.counters import aggregate_counters
+from events.models import Event
+
+FIELDS = ("participants_count", "transactions_count", "total_amount")
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the Event participant/transaction counters against the tables "
+        "and repair the events that drifted (with --verify only report them)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", type=int, action="append", dest="events",
+                            help="Only this event id (can be repeated). Default: all events.")
+        parser.add_argument("--verify", action="store_true",
+                            help="Only compare the counters with the tables, do not write.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        event_ids = options["events"]
+        with transaction.atomic():
+            events = Event.objects.all() if event_ids is None else Event.objects.filter(pk__in=event_ids)
+            if not options["verify"]:
+                # no counter update may land between counting and writing
+                events = events.select_for_update()
+            stored = events.only("pk", *FIELDS).order_by("pk")
+            expected = aggregate_counters(event_ids)
+
+            drifted = []
+            for event in stored:
+                want = expected.get(event.pk, (0, 0, 0))
+                have = tuple(getattr(event, field) for field in FIELDS)
+                if have[0] != want[0] or have[1] != want[1] or have[2] != want[2]:
+                    self.stdout.write(
+                        f"event {event.pk}: participants={have[0]} transactions={have[1]} total={have[2]}, "
+                        f"expected participants={want[0]} transactions={want[1]} total={want[2]}"
+                    )
+                    for field, value in zip(FIELDS, want):
+                        setattr(event, field, value)
+                    drifted.append(event)
+
+            if options["verify"]:
+                if drifted:
+                    raise CommandError(
+                        f"{len(drifted)} event(s) with wrong counters, run without --verify to repair"
+                    )
+                self.stdout.write(self.style.SUCCESS(f"Counters OK ({len(stored)} events)"))
+                return
+            Event.objects.bulk_update(drifted, FIELDS, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} event(s)"))
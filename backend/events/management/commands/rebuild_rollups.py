@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from events.models import DailyRollup, Event
+from events.rollups import aggregate_rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill/rebuild (or with --verify, check) the DailyRollup rows from transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", type=int, action="append", dest="events",
+                            help="Only this event id (can be repeated). Default: all events.")
+        parser.add_argument("--verify", action="store_true",
+                            help="Only compare the rollups with the transactions, do not write.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        event_ids = options["events"]
+        if options["verify"]:
+            self._verify(aggregate_rollups(event_ids), self._stored(event_ids))
+        else:
+            self._rebuild(event_ids, options["batch_size"])
+
+    def _stored(self, event_ids):
+        stored = DailyRollup.objects.filter(count__gt=0)
+        if event_ids is not None:
+            stored = stored.filter(event_id__in=event_ids)
+        return {
+            (event_id, payer_id, day): (amount, count)
+            for event_id, payer_id, day, amount, count
+            in stored.values_list("event_id", "payer_id", "date", "amount", "count")
+        }
+
+    def _verify(self, expected, actual):
+        mismatches = 0
+        for key in sorted(expected.keys() | actual.keys()):
+            want = expected.get(key, (0, 0))
+            have = actual.get(key, (0, 0))
+            if want[0] != have[0] or want[1] != have[1]:
+                mismatches += 1
+                self.stdout.write(
+                    f"event {key[0]} payer {key[1]} on {key[2]}: rollup amount={have[0]} count={have[1]}, "
+                    f"expected amount={want[0]} count={want[1]}"
+                )
+        if mismatches:
+            raise CommandError(f"{mismatches} rollup row(s) out of sync, run without --verify to repair")
+        self.stdout.write(self.style.SUCCESS(f"Rollups OK ({len(expected)} rows)"))
+
+    def _rebuild(self, event_ids, batch_size):
+        with transaction.atomic():
+            events = Event.objects.all() if event_ids is None else Event.objects.filter(pk__in=event_ids)
+            # lock the events first: a write that lands after this waits, one
+            # that landed before is in the aggregate
+            list(events.select_for_update().values_list("pk"))
+            expected = aggregate_rollups(event_ids)
+            rows = [
+                DailyRollup(event_id=event_id, payer_id=payer_id, date=day, amount=amount, count=count)
+                for (event_id, payer_id, day), (amount, count) in expected.items()
+            ]
+            stale = DailyRollup.objects.all()
+            if event_ids is not None:
+                stale = stale.filter(event_id__in=event_ids)
+            stale.delete()
+            DailyRollup.objects.bulk_create(rows, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rows)} rollup row(s)"))
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from events.balance_sheet import BalanceSheet
+from events.balances import aggregate_balances
+from events.cache import plan_key, settlement_cache
+from events.models import Event, ParticipantBalance
+from events.settlement import EXACT_MAX_PARTICIPANTS, EXACT_TIME_BUDGET, settle_optimal, to_cents
+
+
+def settle_chunk(chunk, max_participants, time_budget):
+    """
+    Process-pool worker (top level so it pickles): ``[(event_id, BalanceSheet)]``
+    -> ``[(event_id, SettlementPlan or error message)]``. No database access.
+    """
+    results = []
+    for event_id, balances in chunk:
+        try:
+            results.append((event_id, settle_optimal(balances, max_participants, time_budget)))
+        except ValueError as e:
+            results.append((event_id, str(e)))
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the ParticipantBalance ledger and settlement plans of every event. "
+        "Settlement runs in a process pool; progress is checkpointed so an interrupted "
+        "run can continue with --resume. The plans are written to the settlement cache, "
+        "which must be shared with the web processes (not LocMemCache); --ledger-only "
+        "skips them. Ledger reads and writes stay in this process, one chunk at a time, "
+        "so the database - not --workers - bounds the throughput of that part."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Worker processes for settlement. 1 = in this process. Default: CPU count.")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Events loaded, written and settled together.")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows per INSERT when writing balances.")
+        parser.add_argument("--checkpoint", default="recompute_settlements.json",
+                            help="Checkpoint file, updated after every chunk.")
+        parser.add_argument("--resume", action="store_true",
+                            help="Continue after the last event recorded in the checkpoint.")
+        parser.add_argument("--ledger-only", action="store_true",
+                            help="Rebuild the ledger but do not compute settlement plans.")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be at least 1")
+        self.cache = settlement_cache()
+        if not options["ledger_only"] and isinstance(self.cache, (LocMemCache, DummyCache)):
+            # plans written here would never reach the web processes
+            raise CommandError(
+                f"The settlement cache ({type(self.cache).__name__}) is local to this process. "
+                "Configure a shared backend (Redis, Memcached, database) for "
+                "SETTLEMENT_CACHE_ALIAS, or pass --ledger-only."
+            )
+
+        self.checkpoint_path = options["checkpoint"]
+        self.state = {"last_event_id": 0, "events": 0, "errors": 0}
+        if options["resume"]:
+            try:
+                with open(self.checkpoint_path) as f:
+                    self.state = json.load(f)
+            except FileNotFoundError:
+                raise CommandError(f"No checkpoint at {self.checkpoint_path}")
+            self.stdout.write(f"Resuming after event {self.state['last_event_id']}")
+
+        event_ids = list(
+            Event.objects.filter(pk__gt=self.state["last_event_id"])
+            .order_by("pk").values_list("pk", flat=True)
+        )
+        self.total = self.state["events"] + len(event_ids)
+        self.started = time.perf_counter()
+        self.done_this_run = 0
+        budget = (
+            getattr(settings, "SETTLEMENT_EXACT_MAX_PARTICIPANTS", EXACT_MAX_PARTICIPANTS),
+            getattr(settings, "SETTLEMENT_EXACT_TIME_BUDGET", EXACT_TIME_BUDGET),
+        )
+
+        chunk_size = options["chunk_size"]
+        chunks = [event_ids[i:i + chunk_size] for i in range(0, len(event_ids), chunk_size)]
+        workers = options["workers"]
+        if options["ledger_only"]:
+            for chunk in chunks:
+                versions, _ = self._load(chunk, options["batch_size"])
+                self._finish(chunk, versions, [])
+        elif workers == 1:
+            for chunk in chunks:
+                versions, work = self._load(chunk, options["batch_size"])
+                self._finish(chunk, versions, settle_chunk(work, *budget))
+        else:
+            # keep a couple of chunks per worker in flight: the main process
+            # loads/writes the next chunks while the pool settles earlier ones.
+            # Only settlement is parallel; the workers never touch the database.
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for chunk in chunks:
+                    versions, work = self._load(chunk, options["batch_size"])
+                    pending.append((chunk, versions, pool.submit(settle_chunk, work, *budget)))
+                    while len(pending) >= 2 * workers:
+                        self._finish_future(*pending.popleft())
+                while pending:
+                    self._finish_future(*pending.popleft())
+
+        seconds = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {self.done_this_run} event(s) in {seconds:.1f}s "
+            f"({self.done_this_run / seconds if seconds else 0:.0f} events/s), "
+            f"{self.state['errors']} error(s) in total"
+        ))
+
+    def _load(self, event_ids, batch_size):
+        """Rewrite the ledger of ``event_ids``; returns new versions and worker input."""
+        with transaction.atomic():
+            events = Event.objects.filter(pk__in=event_ids)
+            list(events.select_for_update().values_list("pk"))
+            # aggregated under the lock: a split written in between would be lost otherwise
+            expected = aggregate_balances(event_ids)
+            rows = [
+                ParticipantBalance(event_id=event_id, user_id=user_id, paid=paid, owed=owed)
+                for (event_id, user_id), (paid, owed) in expected.items()
+            ]
+            ParticipantBalance.objects.filter(event_id__in=event_ids).delete()
+            ParticipantBalance.objects.bulk_create(rows, batch_size=batch_size)
+            # plans cached under the old versions were built from the old rows
+            events.update(version=F("version") + 1, updated_at=timezone.now())
+            versions = dict(events.values_list("pk", "version"))
+
+        # BalanceSheets pickle as two byte buffers per event
+        balances = {event_id: BalanceSheet() for event_id in event_ids}
+        for (event_id, user_id), (paid, owed) in sorted(expected.items()):
+            balances[event_id].append(user_id, to_cents(paid) - to_cents(owed))
+        return versions, list(balances.items())
+
+    def _finish_future(self, chunk, versions, future):
+        self._finish(chunk, versions, future.result())
+
+    def _finish(self, chunk, versions, results):
+        plans = {}
+        for event_id, plan in results:
+            if isinstance(plan, str):
+                self.state["errors"] += 1
+                self.stderr.write(f"event {event_id}: {plan}")
+            elif event_id in versions:
+                plans[plan_key(event_id, versions[event_id])] = plan
+        if plans:
+            self.cache.set_many(plans)
+
+        self.state["last_event_id"] = chunk[-1]
+        self.state["events"] += len(chunk)
+        self.done_this_run += len(chunk)
+        self._save_checkpoint()
+
+        seconds = time.perf_counter() - self.started
+        rate = self.done_this_run / seconds if seconds else 0
+        remaining = self.total - self.state["events"]
+        eta = f", ~{remaining / rate:.0f}s left" if rate else ""
+        self.stdout.write(f"{self.state['events']}/{self.total} events ({rate:.0f}/s{eta})")
+
+    def _save_checkpoint(self):
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.checkpoint_path)
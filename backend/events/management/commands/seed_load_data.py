@@ -0,0 +1,113 @@
+import io
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.usernames import index_users
+from events.models import Event, EventParticipant, Transaction, TransactionSplit
+from events.settlement import CENT
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create synthetic users, events and transactions for load tests "
+        "(benchmarks/load_test.py). Users are <prefix>0 .. <prefix>N-1, all "
+        "with the same password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--events-per-user", type=int, default=5)
+        parser.add_argument("--participants", type=int, default=4,
+                            help="Participants per event besides the owner.")
+        parser.add_argument("--transactions", type=int, default=50,
+                            help="Transactions per event.")
+        parser.add_argument("--prefix", default="load")
+        parser.add_argument("--password", default="loadtest")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["participants"] >= options["users"]:
+            raise CommandError("--participants must be smaller than --users")
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            user_ids = self._users(options)
+            event_ids = self._events(user_ids, options, rng)
+
+        # derived data (ledger, rollups, counters, versions) in bulk instead of per-row signals
+        for command in ("rebuild_balances", "rebuild_rollups", "rebuild_event_counters"):
+            call_command(command, events=event_ids, batch_size=batch_size, stdout=io.StringIO())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(user_ids)} user(s) and {len(event_ids)} event(s) "
+            f"in {time.perf_counter() - started:.1f}s (password: {options['password']!r})"
+        ))
+
+    def _users(self, options):
+        names = [f"{options['prefix']}{i}" for i in range(options["users"])]
+        # one hash for everybody: hashing is deliberately slow
+        password = make_password(options["password"])
+        User.objects.bulk_create(
+            [User(username=name, password=password) for name in names],
+            ignore_conflicts=True, batch_size=options["batch_size"],
+        )
+        users = list(User.objects.filter(username__in=names).only("id", "username").order_by("id"))
+        # bulk_create skips accounts.signals
+        index_users(users)
+        return [user.id for user in users]
+
+    def _events(self, user_ids, options, rng):
+        batch_size = options["batch_size"]
+        events = Event.objects.bulk_create(
+            [
+                Event(title=f"Load test {owner_id}-{n}", owner_id=owner_id)
+                for owner_id in user_ids
+                for n in range(options["events_per_user"])
+            ],
+            batch_size=batch_size,
+        )
+
+        members = {}
+        participants = []
+        for event in events:
+            others = rng.sample([pk for pk in user_ids if pk != event.owner_id], options["participants"])
+            members[event.pk] = [event.owner_id] + others
+            participants += [EventParticipant(event_id=event.pk, user_id=pk) for pk in others]
+        EventParticipant.objects.bulk_create(participants, batch_size=batch_size)
+
+        for event in events:
+            people = members[event.pk]
+            rows = [
+                (rng.choice(people), rng.randint(100, 50_000))
+                for _ in range(options["transactions"])
+            ]
+            created = Transaction.objects.bulk_create(
+                [
+                    Transaction(event_id=event.pk, payer_id=payer_id, amount=cents * CENT,
+                                description=f"Expense {n}")
+                    for n, (payer_id, cents) in enumerate(rows)
+                ],
+                batch_size=batch_size,
+            )
+            splits = []
+            for obj, (_, cents) in zip(created, rows):
+                share, extra = divmod(cents, len(people))
+                splits += [
+                    TransactionSplit(transaction_id=obj.pk, user_id=pk,
+                                     share_amount=Decimal(share + (1 if i < extra else 0)) * CENT)
+                    for i, pk in enumerate(people)
+                ]
+            TransactionSplit.objects.bulk_create(splits, batch_size=batch_size)
+        return [event.pk for event in events]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_balances(apps, schema_editor):
+    Transaction = apps.get_model('events', 'Transaction')
+    TransactionSplit = apps.get_model('events', 'TransactionSplit')
+    ParticipantBalance = apps.get_model('events', 'ParticipantBalance')
+
+    totals = {}
+    paid = (
+        Transaction.objects.filter(payer__isnull=False)
+        .values('event', 'payer').annotate(total=Sum('amount'))
+        .values_list('event', 'payer', 'total')
+    )
+    for event_id, user_id, total in paid:
+        totals[event_id, user_id] = [total, 0]
+    owed = (
+        TransactionSplit.objects.values('transaction__event', 'user').annotate(total=Sum('share_amount'))
+        .values_list('transaction__event', 'user', 'total')
+    )
+    for event_id, user_id, total in owed:
+        totals.setdefault((event_id, user_id), [0, 0])[1] = total
+
+    ParticipantBalance.objects.bulk_create(
+        [
+            ParticipantBalance(event_id=event_id, user_id=user_id, paid=paid, owed=owed)
+            for (event_id, user_id), (paid, owed) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_alter_eventparticipant_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('owed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to='events.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('event', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:19
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # existing rows would otherwise all get the migration time
+    Event = apps.get_model('events', 'Event')
+    Event.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0005_event_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
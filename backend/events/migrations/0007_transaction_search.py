@@ -0,0 +1,79 @@
+# Full-text search over Transaction.description, see events.search.
+#
+# SQLite: an external-content FTS5 table kept in sync by triggers (so
+# bulk_create and raw SQL writes are indexed too).
+# PostgreSQL: a GIN expression index matching PostgresSearchBackend.
+# Other databases get nothing and fall back to icontains.
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE events_transaction_fts USING fts5(
+        description,
+        content='events_transaction',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER events_transaction_fts_ai AFTER INSERT ON events_transaction BEGIN
+        INSERT INTO events_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER events_transaction_fts_ad AFTER DELETE ON events_transaction BEGIN
+        INSERT INTO events_transaction_fts(events_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER events_transaction_fts_au AFTER UPDATE OF description ON events_transaction BEGIN
+        INSERT INTO events_transaction_fts(events_transaction_fts, rowid, description)
+        VALUES ('delete', old.id, old.description);
+        INSERT INTO events_transaction_fts(rowid, description) VALUES (new.id, new.description);
+    END
+    """,
+    # index the rows that already exist
+    "INSERT INTO events_transaction_fts(events_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS events_transaction_fts_au",
+    "DROP TRIGGER IF EXISTS events_transaction_fts_ad",
+    "DROP TRIGGER IF EXISTS events_transaction_fts_ai",
+    "DROP TABLE IF EXISTS events_transaction_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX events_transaction_description_tsv ON events_transaction "
+    "USING GIN (to_tsvector('simple', description))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS events_transaction_description_tsv",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def forward(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def backward(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_event_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
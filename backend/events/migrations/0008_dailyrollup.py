@@ -0,0 +1,52 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('events', 'Transaction')
+    DailyRollup = apps.get_model('events', 'DailyRollup')
+    totals = (
+        Transaction.objects.filter(payer__isnull=False)
+        .values('event', 'payer', 'date')
+        .annotate(total=Sum('amount'), n=Count('id'))
+        .values_list('event', 'payer', 'date', 'total', 'n')
+        .order_by()
+    )
+    DailyRollup.objects.bulk_create(
+        (
+            DailyRollup(event_id=event_id, payer_id=payer_id, date=day, amount=total, count=n)
+            for event_id, payer_id, day, total, n in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0007_transaction_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='events.event')),
+                ('payer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'date'], name='rollup_event_date_idx'), models.Index(fields=['payer', 'date'], name='rollup_payer_date_idx')],
+                'unique_together': {('event', 'payer', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
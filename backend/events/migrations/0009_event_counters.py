@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-18 20:37
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def _per_event(model, aggregate, output_field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(event=OuterRef('pk')).order_by().values('event')
+            .annotate(value=aggregate).values('value'),
+            output_field=output_field,
+        ),
+        0,
+        output_field=output_field,
+    )
+
+
+def backfill_counters(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventParticipant = apps.get_model('events', 'EventParticipant')
+    Transaction = apps.get_model('events', 'Transaction')
+    Event.objects.update(
+        participants_count=_per_event(EventParticipant, Count('*'), IntegerField()),
+        transactions_count=_per_event(Transaction, Count('*'), IntegerField()),
+        total_amount=_per_event(Transaction, Sum('amount'), DecimalField(max_digits=14, decimal_places=2)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='participants_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='transactions_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 # events/models.py
 
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -10,6 +10,20 @@ class Event(models.Model):
     title = models.CharField(max_length=200)
     owner = models.ForeignKey(User, related_name='owned_events', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every transaction / participant change, see events.signals
+    version = models.PositiveIntegerField(default=0)
+    # set together with version; ETag / Last-Modified, see events.conditional
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by events.signals, see events.counters; the owner is not counted
+    participants_count = models.IntegerField(default=0)
+    transactions_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            # dashboard / events list: WHERE owner = ? ORDER BY created_at DESC, id DESC
+            models.Index(fields=['owner', '-created_at', '-id'], name='event_owner_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -41,6 +55,12 @@ class Transaction(models.Model):
     description = models.TextField(blank=True)
     date = models.DateField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        # ParticipantBalance is updated from post_save (events.signals),
+        # keep both writes in one DB transaction
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.description} - {self.amount} paid by {self.payer.username}"
 
@@ -59,5 +79,59 @@ class TransactionSplit(models.Model):
 
         unique_together = ('transaction', 'user')
 
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.user.username} owes {self.share_amount} for {self.transaction.description}"
+
+
+class ParticipantBalance(models.Model):
+    """
+    Running totals of what a user paid and owes within an Event.
+    Maintained incrementally by events.signals; `manage.py rebuild_balances`
+    recomputes it from Transaction/TransactionSplit.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='balances')
+    user = models.ForeignKey(User, related_name='event_balances', on_delete=models.CASCADE)
+
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    owed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('event', 'user')
+
+    @property
+    def net(self):
+        return self.paid - self.owed
+
+    def __str__(self):
+        return f"{self.user.username} in {self.event.title}: {self.net}"
+
+
+class DailyRollup(models.Model):
+    """
+    What a payer spent within an Event on one day: sum and number of
+    Transactions. Maintained incrementally by events.signals (and the bulk
+    importer); `manage.py rebuild_rollups` recomputes it. Analytics read only
+    these rows, see events.rollups.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='daily_rollups')
+    payer = models.ForeignKey(User, related_name='daily_rollups', on_delete=models.CASCADE)
+    date = models.DateField()
+
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('event', 'payer', 'date')
+        indexes = [
+            # event analytics: WHERE event = ? AND date BETWEEN ? AND ?
+            models.Index(fields=['event', 'date'], name='rollup_event_date_idx'),
+            # user analytics: WHERE payer = ? AND date BETWEEN ? AND ?
+            models.Index(fields=['payer', 'date'], name='rollup_payer_date_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.user.username} owes {self.share_amount} for {self.transaction.description}"
\ No newline at end of file
+        return f"{self.payer.username} in {self.event.title} on {self.date}: {self.amount}"
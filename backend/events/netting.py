@@ -0,0 +1,91 @@
+# events/netting.py
+"""
+Cross-event ("global") debt netting.
+
+People who share several events would otherwise settle each one separately
+and send each other money back and forth. Here the ParticipantBalance rows of
+a set of events are summed per user in one GROUP BY query and settled as a
+single group. Because every event sums to zero, so does the combined group.
+
+``contributions`` breaks each user's combined position back down per event,
+so every number in the global plan can be traced to the events behind it.
+
+An event with a transaction whose splits do not add up to its amount does not
+sum to zero and would make the whole group unsettleable;
+``user_global_settlement`` leaves such events out and reports them.
+"""
+
+from django.db.models import Q, Sum
+
+from .models import Event, ParticipantBalance
+from .balances import plan_settlement
+from .settlement import to_cents
+
+
+def user_event_ids(user):
+    """Ids of events the user owns or takes part in (as a subquery-friendly queryset)."""
+    return (
+        Event.objects.filter(Q(owner=user) | Q(participants__user=user))
+        .order_by()
+        .values("id")
+        .distinct()
+    )
+
+
+def combined_balances(event_ids):
+    """``{user_id: net_cents}`` summed over ``event_ids`` (list or queryset)."""
+    rows = (
+        ParticipantBalance.objects.filter(event_id__in=event_ids)
+        .values("user")
+        .annotate(paid=Sum("paid"), owed=Sum("owed"))
+        .values_list("user", "paid", "owed")
+    )
+    balances = {}
+    for user_id, paid, owed in rows:
+        net = to_cents(paid) - to_cents(owed)
+        if net:
+            balances[user_id] = net
+    return balances
+
+
+def unbalanced_event_ids(event_ids):
+    """Those of ``event_ids`` whose ledger does not sum to zero."""
+    rows = (
+        ParticipantBalance.objects.filter(event_id__in=event_ids)
+        .values("event")
+        .annotate(paid=Sum("paid"), owed=Sum("owed"))
+        .values_list("event", "paid", "owed")
+        .order_by("event")
+    )
+    return [event_id for event_id, paid, owed in rows if to_cents(paid) != to_cents(owed)]
+
+
+def contributions(event_ids, user_ids=None):
+    """``{user_id: {event_id: net_cents}}``, optionally only for ``user_ids``."""
+    rows = ParticipantBalance.objects.filter(event_id__in=event_ids)
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+
+    result = {}
+    for event_id, user_id, paid, owed in rows.values_list("event_id", "user_id", "paid", "owed"):
+        net = to_cents(paid) - to_cents(owed)
+        if net:
+            result.setdefault(user_id, {})[event_id] = net
+    return result
+
+
+def global_settlement(event_ids):
+    """One ``SettlementPlan`` for all ``event_ids`` together."""
+    return plan_settlement(combined_balances(event_ids))
+
+
+def user_global_settlement(user):
+    """
+    Global plan over every balanced event the user is in.
+    Returns ``(event ids, unbalanced event ids, SettlementPlan)``.
+    """
+    events = user_event_ids(user)
+    unbalanced = unbalanced_event_ids(events)
+    if unbalanced:
+        events = events.exclude(id__in=unbalanced)
+    return list(events.values_list("id", flat=True)), unbalanced, global_settlement(events)
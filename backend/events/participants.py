@@ -0,0 +1,52 @@
+# events/participants.py
+from django.contrib.auth import get_user_model
+
+from accounts.usernames import index_users
+
+from .cache import bump_event_version
+from .counters import recount_participants
+from .models import EventParticipant
+
+User = get_user_model()
+
+
+def parse_usernames(names):
+    """Strip, drop empties and duplicates, keep order. Accepts "a, b" or a list."""
+    if isinstance(names, str):
+        names = names.split(',')
+    return list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+
+
+def add_participants(event, names, role='member'):
+    """
+    Attach users to the event by username, creating users that don't exist yet.
+
+    Uses a fixed number of queries however many names are passed: one lookup,
+    one bulk insert for new users (+ one lookup for their ids and one upsert of
+    their autocomplete keys), one bulk insert for the EventParticipant rows and
+    one recount of ``Event.participants_count``. Call it inside
+    ``transaction.atomic`` together with the event creation.
+    Returns the list of usernames that were added.
+    """
+    names = parse_usernames(names)
+    if not names:
+        return []
+
+    user_ids = dict(User.objects.filter(username__in=names).values_list('username', 'id'))
+    missing = [name for name in names if name not in user_ids]
+    if missing:
+        # ignore_conflicts: a concurrent request may create the same user
+        User.objects.bulk_create([User(username=name) for name in missing], ignore_conflicts=True)
+        created = User.objects.filter(username__in=missing).only('id', 'username')
+        user_ids.update((user.username, user.id) for user in created)
+        # bulk_create skips accounts.signals
+        index_users(created)
+
+    EventParticipant.objects.bulk_create(
+        [EventParticipant(event=event, user_id=user_ids[name], role=role) for name in names],
+        ignore_conflicts=True,
+    )
+    # bulk_create sends no signals; ignore_conflicts hides how many rows are new
+    recount_participants(event.id)
+    bump_event_version(event.id)
+    return names
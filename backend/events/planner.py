@@ -0,0 +1,205 @@
+# events/planner.py
+"""
+Incremental settlement plans.
+
+A ``SettlementPlanner`` holds an event's balances together with a plan that
+settles them. A change to the event (one transaction or split saved/deleted)
+arrives as a per-user balance delta; instead of settling the whole event again
+only the delta is settled and its transfers are merged into the plan, opposite
+transfers between the same two people cancelling out. That costs
+O(k log k) for the k users the change touches, independent of the event size.
+
+Merged plans stay correct (they settle the balances exactly) but may use more
+transfers than a fresh plan. When the transfer count exceeds
+``(non-zero balances - 1) * (1 + SETTLEMENT_PLANNER_DRIFT)`` the planner
+re-plans from its in-memory balances.
+
+Planners live in a small per-process LRU keyed by event id. The ledger
+(events.ledger) and ``bump_event_version`` feed them through
+``transaction.on_commit``, so rolled-back writes never reach them. Each
+planner also counts the version bumps it has seen; events.cache only uses a
+planner whose count matches ``Event.version``, anything else (writes from
+another process, a missed delta) is a mismatch and the plan is rebuilt from
+the database.
+
+A reader may seed a planner while a write is between its ``record_*`` call
+and its commit: whether the balances it read include that write is unknown,
+and the write's callbacks may run before or after the seed. Every recorded
+change and every seed therefore takes a number from one sequence; a change
+recorded before the planner was seeded drops the planner instead of being
+applied to it (or bumping it to a version it does not have).
+
+``_lock`` only guards the LRU itself; each planner has its own lock, so a
+slow ``replan()`` of one big event never blocks the planners of other events.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .balances import plan_settlement
+from .settlement import SettlementPlan, Transfer, settle
+
+DRIFT = 0.25
+MAX_EVENTS = 256
+
+_lock = threading.Lock()
+_planners = OrderedDict()
+# next() on a count is atomic under the GIL
+_sequence = itertools.count()
+
+
+class SettlementPlanner:
+    def __init__(self, balances, plan, version, drift=DRIFT):
+        # a dict: deltas update it in place
+        self.balances = {who: cents for who, cents in balances.items() if cents}
+        self.transfers = {}
+        for t in plan.transfers:
+            self._add_transfer(t.debtor, t.creditor, t.amount)
+        self.mode = plan.mode
+        self.version = version
+        self.drift = drift
+        # deltas not settled yet: the saves of one transaction and its
+        # splits only sum to zero together
+        self.residual = {}
+        self.residual_total = 0
+        self.lock = threading.Lock()
+        self.seeded = next(_sequence)
+
+    @property
+    def ready(self):
+        return not self.residual
+
+    def plan(self):
+        """Current ``SettlementPlan``, or None while a change is half applied."""
+        if not self.ready:
+            return None
+        return SettlementPlan(
+            [Transfer(debtor, creditor, amount) for (debtor, creditor), amount in self.transfers.items()],
+            self.mode,
+        )
+
+    def apply(self, deltas):
+        """Add ``{user: cents}`` to the balances and repair the plan."""
+        for who, cents in deltas.items():
+            if not cents:
+                continue
+            balance = self.balances.get(who, 0) + cents
+            if balance:
+                self.balances[who] = balance
+            else:
+                self.balances.pop(who, None)
+
+            residual = self.residual.get(who, 0) + cents
+            if residual:
+                self.residual[who] = residual
+            else:
+                self.residual.pop(who, None)
+            self.residual_total += cents
+
+        if self.residual and not self.residual_total:
+            for t in settle(sorted(self.residual.items())):
+                self._add_transfer(t.debtor, t.creditor, t.amount)
+            self.residual.clear()
+            self.mode = "incremental"
+            if len(self.transfers) > max(len(self.balances) - 1, 0) * (1 + self.drift):
+                self.replan()
+
+    def replan(self):
+        plan = plan_settlement(self.balances)
+        self.transfers = {}
+        for t in plan.transfers:
+            self._add_transfer(t.debtor, t.creditor, t.amount)
+        self.mode = plan.mode
+
+    def _add_transfer(self, debtor, creditor, amount):
+        back = self.transfers.pop((creditor, debtor), 0)
+        if back > amount:
+            self.transfers[(creditor, debtor)] = back - amount
+        elif back < amount:
+            amount -= back
+            self.transfers[(debtor, creditor)] = self.transfers.get((debtor, creditor), 0) + amount
+
+
+def _max_events():
+    return getattr(settings, "SETTLEMENT_PLANNER_MAX_EVENTS", MAX_EVENTS)
+
+
+def seed(event_id, version, balances, plan):
+    """Start tracking an event from a freshly computed plan."""
+    if _max_events() <= 0:
+        return
+    planner = SettlementPlanner(
+        balances, plan, version, drift=getattr(settings, "SETTLEMENT_PLANNER_DRIFT", DRIFT)
+    )
+    with _lock:
+        _planners[event_id] = planner
+        _planners.move_to_end(event_id)
+        while len(_planners) > _max_events():
+            _planners.popitem(last=False)
+
+
+def _get(event_id):
+    with _lock:
+        planner = _planners.get(event_id)
+        if planner is not None:
+            _planners.move_to_end(event_id)
+        return planner
+
+
+def _forget(event_id, planner):
+    with _lock:
+        if _planners.get(event_id) is planner:
+            del _planners[event_id]
+
+
+def current_plan(event_id, version):
+    """The tracked plan for ``event_id`` if it is at ``version``, else None."""
+    planner = _get(event_id)
+    if planner is None:
+        return None
+    with planner.lock:
+        if planner.version == version:
+            return planner.plan()
+    # somebody else changed the event, it has to be rebuilt
+    _forget(event_id, planner)
+    return None
+
+
+def _apply(event_id, deltas, recorded):
+    planner = _get(event_id)
+    if planner is None:
+        return
+    if planner.seeded > recorded:
+        # seeded mid-write, may or may not contain the delta
+        _forget(event_id, planner)
+        return
+    # may replan (a full settlement): only this event waits for it
+    with planner.lock:
+        planner.apply(deltas)
+
+
+def _bump(event_ids, recorded):
+    for event_id in event_ids:
+        planner = _get(event_id)
+        if planner is None:
+            continue
+        if planner.seeded > recorded:
+            _forget(event_id, planner)
+            continue
+        with planner.lock:
+            planner.version += 1
+
+
+def record_delta(event_id, deltas):
+    """Queue ``{user_id: cents}`` for the event's planner, applied on commit."""
+    transaction.on_commit(partial(_apply, event_id, deltas, next(_sequence)))
+
+
+def record_bump(event_ids):
+    """Queue a version bump; call after the deltas of the same change."""
+    transaction.on_commit(partial(_bump, list(event_ids), next(_sequence)))
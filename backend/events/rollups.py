@@ -0,0 +1,100 @@
+# events/rollups.py
+"""
+Daily spending rollups: one DailyRollup row per (event, payer, date) with the
+sum and number of that payer's transactions on that day.
+
+Write side: ``apply_rollup_delta`` adds to a row with F() expressions, like
+events.ledger does for balances. events.signals calls it on every Transaction
+save/delete and the importer once per (payer, date) of a chunk.
+``aggregate_rollups`` recomputes the rows from Transaction with one GROUP BY
+query and backs ``manage.py rebuild_rollups``.
+
+Read side: ``event_daily`` / ``user_daily`` and the per-payer / per-event
+totals only touch rollup rows, so a year of an event costs at most
+days x payers rows no matter how many transactions it has. Transactions whose payer was deleted are not
+counted, same as in the ledger.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import DailyRollup, Transaction
+
+
+def apply_rollup_delta(event_id, payer_id, day, amount, count):
+    """Add ``amount`` (Decimal) and ``count`` to the (event, payer, day) row."""
+    if payer_id is None or (not amount and not count):
+        return
+    rows = DailyRollup.objects.filter(event_id=event_id, payer_id=payer_id, date=day)
+    with transaction.atomic():
+        if rows.update(amount=F('amount') + amount, count=F('count') + count) or count < 0:
+            # a missing row on removal went away with its event or payer
+            return
+        _, created = DailyRollup.objects.get_or_create(
+            event_id=event_id, payer_id=payer_id, date=day,
+            defaults={'amount': amount, 'count': count},
+        )
+        if not created:
+            rows.update(amount=F('amount') + amount, count=F('count') + count)
+
+
+def apply_rollup_deltas(event_id, deltas):
+    """Bulk variant: ``deltas`` is ``{(payer_id, date): (amount, count)}``."""
+    for (payer_id, day), (amount, count) in deltas.items():
+        apply_rollup_delta(event_id, payer_id, day, amount, count)
+
+
+def aggregate_rollups(event_ids=None):
+    """``{(event_id, payer_id, date): (amount, count)}`` straight from Transaction."""
+    transactions = Transaction.objects.filter(payer__isnull=False)
+    if event_ids is not None:
+        transactions = transactions.filter(event_id__in=event_ids)
+    rows = (
+        transactions.values('event', 'payer', 'date')
+        .annotate(total=Sum('amount'), n=Count('id'))
+        .values_list('event', 'payer', 'date', 'total', 'n')
+        .order_by()
+    )
+    return {(event_id, payer_id, day): (total, n) for event_id, payer_id, day, total, n in rows}
+
+
+def _in_range(rollups, start=None, end=None):
+    rollups = rollups.filter(count__gt=0)
+    if start is not None:
+        rollups = rollups.filter(date__gte=start)
+    if end is not None:
+        rollups = rollups.filter(date__lte=end)
+    return rollups
+
+
+def _per(rollups, field):
+    return rollups.values(field).annotate(total=Sum('amount'), n=Sum('count')).values_list(field, 'total', 'n')
+
+
+def event_daily(event_id, start=None, end=None):
+    """``[(date, amount, count)]`` of the event per day, oldest first."""
+    rollups = _in_range(DailyRollup.objects.filter(event_id=event_id), start, end)
+    return list(_per(rollups, 'date').order_by('date'))
+
+
+def event_payer_totals(event_id, start=None, end=None):
+    """``[(payer_id, amount, count)]`` of the event in the range, biggest spender first."""
+    rollups = _in_range(DailyRollup.objects.filter(event_id=event_id), start, end)
+    return list(_per(rollups, 'payer').order_by('-total', 'payer'))
+
+
+def _user_rollups(user_id, event_ids, start, end):
+    rollups = DailyRollup.objects.filter(payer_id=user_id)
+    if event_ids is not None:
+        rollups = rollups.filter(event_id__in=event_ids)
+    return _in_range(rollups, start, end)
+
+
+def user_daily(user_id, start=None, end=None, event_ids=None):
+    """``[(date, amount, count)]`` the user paid per day, oldest first."""
+    return list(_per(_user_rollups(user_id, event_ids, start, end), 'date').order_by('date'))
+
+
+def user_event_totals(user_id, start=None, end=None, event_ids=None):
+    """``[(event_id, amount, count)]`` the user paid per event in the range, biggest first."""
+    return list(_per(_user_rollups(user_id, event_ids, start, end), 'event').order_by('-total', 'event'))
@@ -0,0 +1,203 @@
+# events/settlement.py
+"""
+Settlement engine.
+
+Works on integer cents only. A balance is ``(participant, net_cents)`` where a
+positive value means the participant is owed money and a negative value means
+they owe money. Balances of one group must sum to zero.
+
+Balances can be passed as any iterable of pairs or as an
+events.balance_sheet.BalanceSheet, the compact array-backed form.
+
+This module has no Django imports so it can be used from plain scripts
+(see ``DividePayments.py``).
+"""
+
+import heapq
+import time
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from typing import NamedTuple
+
+from .balance_sheet import BalanceSheet
+
+CENT = Decimal("0.01")
+
+
+class Transfer(NamedTuple):
+    debtor: object
+    creditor: object
+    amount: int  # cents
+
+    def as_dict(self):
+        return {
+            "debtor": self.debtor,
+            "creditor": self.creditor,
+            "amount": format_cents(self.amount),
+        }
+
+
+def to_cents(amount):
+    """Convert an int/float/Decimal/str money amount to integer cents."""
+    if isinstance(amount, int):
+        return amount * 100
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int((amount / CENT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_cents(cents):
+    sign = "-" if cents < 0 else ""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{frac:02d}"
+
+
+def _pairs(balances):
+    return balances.items() if isinstance(balances, BalanceSheet) else balances
+
+
+def equal_split(paid):
+    """
+    Turn ``(participant, paid_cents)`` pairs into a ``BalanceSheet`` of net
+    balances where everybody owes the same share of the total.
+
+    When the total does not divide evenly, the leftover cents are assigned to
+    the first participants (in input order), so the result always sums to zero.
+    """
+    if isinstance(paid, BalanceSheet):
+        sheet = BalanceSheet(array("q", paid.ids), array("q", paid.cents), paid.labels)
+    else:
+        sheet = BalanceSheet.from_pairs(paid)
+    if not sheet:
+        return sheet
+    cents = sheet.cents
+    share, extra = divmod(sum(cents), len(cents))
+    for idx in range(len(cents)):
+        cents[idx] -= share + (1 if idx < extra else 0)
+    return sheet
+
+
+def settle(balances):
+    """
+    Greedy settlement: repeatedly match the largest creditor with the largest
+    debtor. Uses two heaps, so it runs in O(n log n) and produces at most
+    ``n - 1`` transfers.
+
+    Ties are broken by input order so the result is deterministic.
+    Returns a list of ``Transfer`` records.
+    """
+    creditors = []
+    debtors = []
+    total = 0
+    for idx, (who, cents) in enumerate(_pairs(balances)):
+        total += cents
+        if cents > 0:
+            creditors.append((-cents, idx, who))
+        elif cents < 0:
+            debtors.append((cents, idx, who))
+    if total != 0:
+        raise ValueError(f"Balances must sum to zero, got {format_cents(total)}")
+
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors:
+        cred, c_idx, creditor = heapq.heappop(creditors)
+        debt, d_idx, debtor = heapq.heappop(debtors)
+        amount = min(-cred, -debt)
+        transfers.append(Transfer(debtor, creditor, amount))
+        if cred + amount < 0:
+            heapq.heappush(creditors, (cred + amount, c_idx, creditor))
+        if debt + amount < 0:
+            heapq.heappush(debtors, (debt + amount, d_idx, debtor))
+    return transfers
+
+
+class SettlementPlan(NamedTuple):
+    transfers: list
+    mode: str  # "optimal", "greedy" or "incremental" (events.planner)
+
+
+EXACT_MAX_PARTICIPANTS = 14
+EXACT_TIME_BUDGET = 0.1  # seconds
+
+
+def _zero_sum_groups(values, deadline):
+    """
+    Split ``values`` (non-zero cents, summing to zero) into the largest number
+    of zero-sum groups. Returns a list of index lists, or None when the
+    deadline passed.
+
+    Bitmask DP: ``best[mask]`` is the most zero-sum groups any ordering of
+    ``mask`` can be cut into; a mask whose own sum is zero closes one more group.
+    Settling every group separately takes ``len(group) - 1`` transfers, so more
+    groups means fewer transfers - ``n - groups`` is the minimum.
+    """
+    n = len(values)
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    best = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        if not mask & 1023 and time.perf_counter() > deadline:
+            return None
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + values[low.bit_length() - 1]
+        top = 0
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            if best[mask ^ bit] > top:
+                top = best[mask ^ bit]
+        best[mask] = top + (sums[mask] == 0)
+
+    # walk back to recover an order whose zero-sum prefixes give the groups
+    order = []
+    mask = full
+    while mask:
+        closes = sums[mask] == 0
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            if best[mask ^ bit] + closes == best[mask]:
+                order.append(bit.bit_length() - 1)
+                mask ^= bit
+                break
+
+    groups = []
+    current = []
+    total = 0
+    for idx in reversed(order):
+        current.append(idx)
+        total += values[idx]
+        if total == 0:
+            groups.append(current)
+            current = []
+    return groups
+
+
+def settle_optimal(balances, max_participants=EXACT_MAX_PARTICIPANTS, time_budget=EXACT_TIME_BUDGET):
+    """
+    Minimum number of transfers when the group is small enough, heap greedy
+    otherwise.
+
+    Groups with more than ``max_participants`` non-zero balances, or where the
+    exact search runs past ``time_budget`` seconds, fall back to ``settle``.
+    The returned ``SettlementPlan.mode`` says which one produced the plan.
+    """
+    if not isinstance(balances, BalanceSheet):
+        balances = list(balances)
+    nonzero = [(who, cents) for who, cents in _pairs(balances) if cents]
+    if len(nonzero) > max_participants or sum(cents for _, cents in nonzero):
+        # too big, or not balanced (settle raises the error)
+        return SettlementPlan(settle(balances), "greedy")
+
+    groups = _zero_sum_groups([cents for _, cents in nonzero], time.perf_counter() + time_budget)
+    if groups is None:
+        return SettlementPlan(settle(balances), "greedy")
+    transfers = []
+    for group in groups:
+        transfers.extend(settle(nonzero[idx] for idx in sorted(group)))
+    return SettlementPlan(transfers, "optimal")
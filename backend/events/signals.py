@@ -0,0 +1,150 @@
+# events/signals.py
+"""
+Keeps derived per-event data in sync with Transaction / TransactionSplit /
+EventParticipant writes: the ParticipantBalance ledger, the DailyRollup rows,
+the Event counters and Event.version (the settlement cache key). Connected in EventsConfig.ready().
+
+Ledger deltas are applied before the version bump: the settlement planner
+(events.planner) relies on that order to spot plans it has to rebuild.
+
+For edits the old row is read in pre_save, so the post_save handler can
+reverse the old values before applying the new ones.
+"""
+
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_event_version
+from .counters import apply_event_counters
+from .ledger import apply_balance_delta
+from .models import EventParticipant, Transaction, TransactionSplit
+from .rollups import apply_rollup_delta
+
+
+def _decimal(value):
+    # amounts may be assigned as str/float before save
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_old_transaction(sender, instance, raw=False, **kwargs):
+    instance._ledger_old = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_old = (
+        Transaction.objects.filter(pk=instance.pk)
+        .values_list('event_id', 'payer_id', 'amount', 'date')
+        .first()
+    )
+
+
+def _update_rollups(old, new):
+    # old/new: (event_id, payer_id, amount, date)
+    if old is not None and old[:2] == new[:2] and old[3] == new[3]:
+        apply_rollup_delta(new[0], new[1], new[3], new[2] - old[2], 0)
+        return
+    if old is not None:
+        apply_rollup_delta(old[0], old[1], old[3], -old[2], -1)
+    apply_rollup_delta(new[0], new[1], new[3], new[2], 1)
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_ledger_old', None)
+    new = (instance.event_id, instance.payer_id, _decimal(instance.amount))
+    if old is not None and old[:2] == new[:2]:
+        apply_balance_delta(new[0], new[1], paid=new[2] - old[2])
+    else:
+        if old is not None:
+            apply_balance_delta(old[0], old[1], paid=-old[2], create=False)
+        apply_balance_delta(new[0], new[1], paid=new[2])
+
+    if old is not None and old[0] != new[0]:
+        # moved to another event: the shares owed move with it
+        shares = TransactionSplit.objects.filter(transaction=instance).values_list('user_id', 'share_amount')
+        for user_id, share in shares:
+            apply_balance_delta(old[0], user_id, owed=-share, create=False)
+            apply_balance_delta(new[0], user_id, owed=share)
+    _update_rollups(old, new + (instance.date,))
+    if old is None:
+        apply_event_counters(new[0], transactions=1, amount=new[2])
+    elif old[0] == new[0]:
+        apply_event_counters(new[0], amount=new[2] - old[2])
+    else:
+        apply_event_counters(old[0], transactions=-1, amount=-old[2])
+        apply_event_counters(new[0], transactions=1, amount=new[2])
+    # after the deltas, see events.planner
+    bump_event_version(new[0], old[0] if old is not None and old[0] != new[0] else None)
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    amount = _decimal(instance.amount)
+    apply_balance_delta(instance.event_id, instance.payer_id, paid=-amount, create=False)
+    apply_rollup_delta(instance.event_id, instance.payer_id, instance.date, -amount, -1)
+    apply_event_counters(instance.event_id, transactions=-1, amount=-amount)
+    bump_event_version(instance.event_id)
+
+
+def _split_event_id(split):
+    if TransactionSplit._meta.get_field('transaction').is_cached(split):
+        return split.transaction.event_id
+    return (
+        Transaction.objects.filter(pk=split.transaction_id)
+        .values_list('event_id', flat=True)
+        .first()
+    )
+
+
+@receiver(pre_save, sender=TransactionSplit)
+def remember_old_split(sender, instance, raw=False, **kwargs):
+    instance._ledger_old = None
+    if raw or instance.pk is None:
+        return
+    instance._ledger_old = (
+        TransactionSplit.objects.filter(pk=instance.pk)
+        .values_list('transaction__event_id', 'user_id', 'share_amount')
+        .first()
+    )
+
+
+@receiver(post_save, sender=TransactionSplit)
+def split_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_ledger_old', None)
+    new = (_split_event_id(instance), instance.user_id, _decimal(instance.share_amount))
+    if old is not None and old[:2] == new[:2]:
+        apply_balance_delta(new[0], new[1], owed=new[2] - old[2])
+    else:
+        if old is not None:
+            apply_balance_delta(old[0], old[1], owed=-old[2], create=False)
+        apply_balance_delta(new[0], new[1], owed=new[2])
+    bump_event_version(new[0], old[0] if old is not None and old[0] != new[0] else None)
+
+
+@receiver(post_delete, sender=TransactionSplit)
+def split_deleted(sender, instance, **kwargs):
+    event_id = _split_event_id(instance)
+    if event_id is not None:
+        apply_balance_delta(event_id, instance.user_id, owed=-_decimal(instance.share_amount), create=False)
+        bump_event_version(event_id)
+
+
+@receiver(post_save, sender=EventParticipant)
+def participant_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_event_counters(instance.event_id, participants=1)
+    bump_event_version(instance.event_id)
+
+
+@receiver(post_delete, sender=EventParticipant)
+def participant_deleted(sender, instance, **kwargs):
+    apply_event_counters(instance.event_id, participants=-1)
+    bump_event_version(instance.event_id)
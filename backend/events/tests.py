@@ -1,3 +1,773 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+import numpy as np
+
+from accounts.models import FoldedUsername
+from jobs import queue
+from jobs.models import Job
+from jobs.queue import enqueue
+
+from . import planner, search
+from .balances import compute_event_balances, event_balances, plan_settlement
+from .batch_settlement import net_from_paid, settle_batch
+from .cache import cached_event_settlement, settlement_cache
+from .counters import aggregate_counters
+from .importer import import_transactions
+from .listing import MAX_PAGE_SIZE, owned_events_page
+from .models import DailyRollup, Event, EventParticipant, Transaction, TransactionSplit
+from .participants import add_participants
+from .rollups import aggregate_rollups
+from .settlement import CENT, Transfer, equal_split, settle_optimal
+
+User = get_user_model()
+
+
+def _nonzero(balances):
+    return {who: cents for who, cents in balances.items() if cents}
+
+
+def _settled(balances, transfers):
+    """Balances after paying ``transfers``: all zero if the plan is exact."""
+    left = dict(balances)
+    for t in transfers:
+        left[t.debtor] = left.get(t.debtor, 0) + t.amount
+        left[t.creditor] = left.get(t.creditor, 0) - t.amount
+    return _nonzero(left)
+
+
+class SettleBatchTests(TestCase):
+    def random_batch(self, rng, events=40):
+        """Shuffled ``(event_ids, user_ids, paid_cents)`` rows of ``events`` events."""
+        rows = [
+            (event_id, user_id, rng.choice([0, rng.randint(1, 100_000)]))
+            for event_id in rng.sample(range(1, 10_000), events)
+            for user_id in range(rng.randint(1, 12))
+        ]
+        rng.shuffle(rows)
+        return [list(column) for column in zip(*rows)]
+
+    def test_net_from_paid_matches_equal_split(self):
+        event_ids, user_ids, paid = self.random_batch(random.Random(2))
+        net = net_from_paid(event_ids, paid)
+        for event_id in set(event_ids):
+            rows = [i for i, e in enumerate(event_ids) if e == event_id]
+            sheet = equal_split([(user_ids[i], paid[i]) for i in rows])
+            self.assertEqual([int(net[i]) for i in rows], list(sheet.cents))
+
+    def test_every_event_is_settled(self):
+        event_ids, user_ids, paid = self.random_batch(random.Random(3))
+        net = net_from_paid(event_ids, paid)
+        result = settle_batch(event_ids, user_ids, net)
+        self.assertTrue(np.all(result.amount > 0))
+        self.assertTrue(np.all(result.debtor != result.creditor))
+        for event_id in set(event_ids):
+            balances = {u: int(n) for e, u, n in zip(event_ids, user_ids, net) if e == event_id}
+            plan = result.for_event(event_id)
+            transfers = [
+                Transfer(int(d), int(c), int(a)) for d, c, a in zip(plan.debtor, plan.creditor, plan.amount)
+            ]
+            with self.subTest(event=event_id):
+                self.assertEqual(_settled(balances, transfers), {})
+                self.assertLessEqual(len(transfers), max(len(_nonzero(balances)) - 1, 0))
+
+    def test_unbalanced_event_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'event 7 is off by 5 cents'):
+            settle_batch([1, 1, 7, 7], [1, 2, 1, 2], [10, -10, 10, -5])
+
+    def test_empty_batch(self):
+        self.assertEqual(len(settle_batch([], [], []).amount), 0)
+
+
+class EventDataMixin:
+    def setUp(self):
+        self.rng = random.Random(20261018)
+        self.users = [User.objects.create_user(f'user{n}') for n in range(6)]
+        self.events = [Event.objects.create(title=f'Event {n}', owner=self.users[n]) for n in range(2)]
+        for event in self.events:
+            for user in self.users:
+                if user != event.owner:
+                    EventParticipant.objects.create(event=event, user=user)
+        planner._planners.clear()
+        settlement_cache().clear()
+
+    def add_transaction(self, event=None, members=None):
+        """A transaction whose splits add up to its amount."""
+        event = event or self.rng.choice(self.events)
+        members = members or self.rng.sample(self.users, self.rng.randint(1, len(self.users)))
+        cents = self.rng.randint(1, 50_000)
+        t = Transaction.objects.create(event=event, payer=self.rng.choice(self.users), amount=cents * CENT)
+        share, extra = divmod(cents, len(members))
+        for idx, user in enumerate(members):
+            TransactionSplit.objects.create(
+                transaction=t, user=user, share_amount=(share + (1 if idx < extra else 0)) * CENT,
+            )
+        return t
+
+
+class LedgerSignalTests(EventDataMixin, TestCase):
+    """ParticipantBalance, DailyRollup and the Event counters follow every write."""
+
+    def assertDerivedDataInSync(self):
+        for event in self.events:
+            self.assertEqual(_nonzero(event_balances(event.id)), _nonzero(compute_event_balances(event.id)))
+
+        stored = {
+            (r.event_id, r.payer_id, r.date): (r.amount, r.count)
+            for r in DailyRollup.objects.filter(count__gt=0)
+        }
+        self.assertEqual(stored, aggregate_rollups())
+
+        expected = aggregate_counters()
+        for event_id, participants, transactions, total in Event.objects.values_list(
+            'id', 'participants_count', 'transactions_count', 'total_amount',
+        ):
+            self.assertEqual((participants, transactions, total), expected.get(event_id, (0, 0, 0)))
+
+    def test_random_writes(self):
+        for _ in range(5):
+            self.add_transaction()
+
+        for step in range(150):
+            action = self.rng.choice(
+                ['create', 'amount', 'payer', 'move', 'share', 'split_user', 'delete_split', 'delete']
+            )
+            transactions = list(Transaction.objects.all())
+            splits = list(TransactionSplit.objects.select_related('transaction'))
+            if action == 'create' or not transactions:
+                self.add_transaction()
+            elif action == 'amount':
+                t = self.rng.choice(transactions)
+                t.amount = self.rng.randint(1, 50_000) * CENT
+                t.save()
+            elif action == 'payer':
+                t = self.rng.choice(transactions)
+                t.payer = self.rng.choice(self.users + [None])
+                t.save()
+            elif action == 'move':
+                t = self.rng.choice(transactions)
+                t.event = self.rng.choice(self.events)
+                t.save()
+            elif action == 'delete':
+                self.rng.choice(transactions).delete()
+            elif not splits:
+                continue
+            elif action == 'share':
+                split = self.rng.choice(splits)
+                split.share_amount = self.rng.randint(0, 20_000) * CENT
+                split.save()
+            elif action == 'split_user':
+                split = self.rng.choice(splits)
+                taken = set(split.transaction.transactionsplit_set.values_list('user_id', flat=True))
+                free = [user for user in self.users if user.id not in taken]
+                if free:
+                    split.user = self.rng.choice(free)
+                    split.save()
+            elif action == 'delete_split':
+                self.rng.choice(splits).delete()
+
+            with self.subTest(step=step, action=action):
+                self.assertDerivedDataInSync()
+
+    def test_participants_counter(self):
+        event = self.events[0]
+        EventParticipant.objects.filter(event=event, user=self.users[1]).delete()
+        event.refresh_from_db()
+        self.assertEqual(event.participants_count, len(self.users) - 2)
+
+
+class AddParticipantsTests(EventDataMixin, TestCase):
+    def queries(self, names):
+        event = Event.objects.create(title='Trip', owner=self.users[0])
+        with CaptureQueriesContext(connection) as ctx:
+            add_participants(event, names)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_the_names(self):
+        few = self.queries([f'new{n}' for n in range(3)] + ['user1'])
+        many = self.queries([f'other{n}' for n in range(40)] + ['user1', 'user2', 'user3'])
+        self.assertEqual(few, many)
+
+    def test_existing_new_and_repeated_names(self):
+        event = Event.objects.create(title='Trip', owner=self.users[0])
+        added = add_participants(event, ' user1, newbie ,user1,, newbie')
+        self.assertEqual(added, ['user1', 'newbie'])
+        self.assertEqual(
+            set(event.participants.values_list('user__username', flat=True)), {'user1', 'newbie'},
+        )
+        newbie = User.objects.get(username='newbie')
+        self.assertTrue(FoldedUsername.objects.filter(user=newbie, folded='newbie').exists())
+        event.refresh_from_db()
+        self.assertEqual(event.participants_count, 2)
+        # a second call adds nothing twice
+        add_participants(event, ['user1', 'newbie'])
+        event.refresh_from_db()
+        self.assertEqual(event.participants_count, 2)
+
+    def test_create_event_api_is_atomic(self):
+        self.client.force_login(self.users[0])
+        body = json.dumps({'title': 'Doomed', 'participants': ['user1', 'ghost']})
+        with mock.patch('events.participants.recount_participants', side_effect=DatabaseError('boom')):
+            response = self.client.post('/api/events/create/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Event.objects.filter(title='Doomed').exists())
+        self.assertFalse(User.objects.filter(username='ghost').exists())
+
+        response = self.client.post('/api/events/create/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['participants_count'], 2)
+
+
+class ExportTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.events[0]
+        for _ in range(12):
+            self.add_transaction(self.event)
+        self.add_transaction(self.events[1])  # not exported
+        self.client.force_login(self.event.owner)
+
+    def export(self, **params):
+        response = self.client.get(f'/api/events/{self.event.id}/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content).decode()
+
+    def check_records(self, records):
+        transactions = {r['transaction']: r for r in records if r['record'] == 'transaction'}
+        db = Transaction.objects.filter(event=self.event).select_related('payer')
+        self.assertEqual(
+            {pk: (r['payer'], Decimal(r['amount'])) for pk, r in transactions.items()},
+            {t.id: (t.payer.username, t.amount) for t in db},
+        )
+        shares = {}
+        for r in records:
+            if r['record'] == 'split':
+                shares[r['transaction']] = shares.get(r['transaction'], 0) + Decimal(r['amount'])
+        self.assertEqual(shares, {pk: Decimal(r['amount']) for pk, r in transactions.items()})
+
+        ids = dict(User.objects.values_list('username', 'id'))
+        transfers = [
+            Transfer(ids[r['user']], ids[r['payer']], int(Decimal(r['amount']) * 100))
+            for r in records if r['record'] == 'transfer'
+        ]
+        self.assertTrue(transfers)
+        self.assertEqual(_settled(event_balances(self.event.id), transfers), {})
+
+    def test_csv(self):
+        response, body = self.export(format='csv', settlement='1')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        for row in rows:
+            if row['transaction']:
+                row['transaction'] = int(row['transaction'])
+        self.check_records(rows)
+
+    def test_jsonl(self):
+        response, body = self.export(format='jsonl', settlement='1')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.check_records([json.loads(line) for line in body.splitlines()])
+
+    def test_unbalanced_event_reports_an_error_record(self):
+        # splits no longer add up to the amount
+        TransactionSplit.objects.filter(transaction__event=self.event).first().delete()
+        _, body = self.export(format='jsonl', settlement='1')
+        self.assertEqual(json.loads(body.splitlines()[-1])['record'], 'error')
+
+    def test_bad_format_and_foreign_event(self):
+        self.assertEqual(
+            self.client.get(f'/api/events/{self.event.id}/export/', {'format': 'xml'}).status_code, 400,
+        )
+        Event.objects.filter(pk=self.event.pk).update(owner=self.users[1])
+        EventParticipant.objects.filter(event=self.event, user=self.users[0]).delete()
+        self.assertEqual(self.client.get(f'/api/events/{self.event.id}/export/').status_code, 404)
+
+
+class EventsListTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = self.users[0]
+        same_time = Event.objects.get(pk=self.events[0].pk).created_at
+        # a few share created_at, so the id tie-break matters
+        Event.objects.bulk_create(
+            [Event(title=f'Same {n}', owner=self.owner, created_at=same_time) for n in range(5)]
+            + [Event(title=f'Other {n}', owner=self.owner) for n in range(20)]
+            + [Event(title='Not mine', owner=self.users[1])]
+        )
+        Event.objects.filter(title__startswith='Same').update(created_at=same_time)  # past auto_now_add
+        self.client.force_login(self.owner)
+
+    def test_pages_cover_every_event_once_in_order(self):
+        expected = list(
+            Event.objects.filter(owner=self.owner).order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'limit': 4} if cursor is None else {'limit': 4, 'cursor': cursor}
+            data = self.client.get('/api/events/', params).json()
+            seen += [row['id'] for row in data['results']]
+            pages += 1
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, -(-len(expected) // 4))
+
+    def test_page_is_one_query(self):
+        with self.assertNumQueries(1):
+            events, _ = owned_events_page(self.owner, limit=5)
+            [(e.owner.username, e.participants_count, e.total_amount) for e in events]
+
+    def test_bad_parameters(self):
+        for params, message in [
+            ({'cursor': 'garbage!'}, 'Invalid cursor'),
+            ({'limit': 'abc'}, 'limit must be a positive integer'),
+            ({'limit': '0'}, 'limit must be a positive integer'),
+            ({'limit': '-3'}, 'limit must be a positive integer'),
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/events/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': message})
+
+    def test_limit_is_capped(self):
+        Event.objects.bulk_create([Event(title=f'More {n}', owner=self.owner) for n in range(MAX_PAGE_SIZE)])
+        data = self.client.get('/api/events/', {'limit': MAX_PAGE_SIZE * 5}).json()
+        self.assertEqual(len(data['results']), MAX_PAGE_SIZE)
+        self.assertIsNotNone(data['next_cursor'])
+
+
+class AsyncViewsTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.events[0]
+        for _ in range(8):
+            self.add_transaction(self.event)
+        self.client.force_login(self.event.owner)
+        self.async_client.force_login(self.event.owner)
+
+    async def test_same_responses_as_the_sync_views(self):
+        for endpoint in ('', 'balances/', 'settlement/'):
+            with self.subTest(endpoint=endpoint):
+                sync = await sync_to_async(self.client.get)(f'/api/events/{self.event.id}/{endpoint}')
+                response = await self.async_client.get(f'/api/async/events/{self.event.id}/{endpoint}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), sync.json())
+                self.assertEqual(response['ETag'], sync['ETag'])
+
+    async def test_settlement_settles_the_ledger(self):
+        response = await self.async_client.get(f'/api/async/events/{self.event.id}/settlement/')
+        balances = await sync_to_async(event_balances)(self.event.id)
+        transfers = [
+            Transfer(t['debtor'], t['creditor'], int(Decimal(t['amount']) * 100))
+            for t in response.json()['transfers']
+        ]
+        self.assertTrue(transfers)
+        self.assertEqual(_settled(balances, transfers), {})
+
+    async def test_errors(self):
+        response = await AsyncClient().get(f'/api/async/events/{self.event.id}/')
+        self.assertEqual(response.status_code, 401)
+        other = await Event.objects.acreate(title='Private', owner=self.users[5])
+        response = await self.async_client.get(f'/api/async/events/{other.id}/balances/')
+        self.assertEqual(response.status_code, 404)
+
+
+class GlobalSettlementTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.users[2]  # participant of both events
+        for event in self.events:
+            for _ in range(6):
+                self.add_transaction(event)
+        self.client.force_login(self.user)
+
+    def combined(self, event_ids):
+        total = {}
+        for event_id in event_ids:
+            for user_id, cents in event_balances(event_id).items():
+                total[user_id] = total.get(user_id, 0) + cents
+        return total
+
+    def check_plan(self, data, event_ids):
+        self.assertEqual(sorted(data['events']), sorted(event_ids))
+        transfers = [
+            Transfer(t['debtor'], t['creditor'], int(Decimal(t['amount']) * 100)) for t in data['transfers']
+        ]
+        self.assertEqual(_settled(self.combined(event_ids), transfers), {})
+
+    def test_plan_settles_all_events_together(self):
+        data = self.client.get('/api/events/global-settlement/').json()
+        self.check_plan(data, [e.id for e in self.events])
+        self.assertEqual(data['unbalanced_events'], [])
+
+    def test_unbalanced_event_is_left_out(self):
+        broken, fine = self.events
+        # splits of one transaction no longer add up to its amount
+        TransactionSplit.objects.filter(transaction__event=broken).first().delete()
+
+        response = self.client.get('/api/events/global-settlement/', {'trace': 'all'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['unbalanced_events'], [broken.id])
+        self.check_plan(data, [fine.id])
+        self.assertFalse(
+            any(str(broken.id) in per_event for per_event in data['contributions'].values())
+        )
+
+        # the background job gets the same payload instead of failing on every attempt
+        job = enqueue('events.global_settlement', {'user_id': self.user.id, 'trace_all': True})
+        self.assertEqual(queue.run(queue.claim('test')), Job.DONE)
+        job.refresh_from_db()
+        self.assertEqual(job.result['unbalanced_events'], [broken.id])
+        self.assertEqual(job.result['transfers'], data['transfers'])
+
+
+class ConditionalGetTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = self.events[0]
+        self.add_transaction(self.event)
+        self.client.force_login(self.event.owner)
+        self.url = f'/api/events/{self.event.id}/balances/'
+
+    def age(self, seconds=10):
+        Event.objects.filter(pk=self.event.pk).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_if_none_match(self):
+        for url in (self.url, f'/api/async/events/{self.event.id}/settlement/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction(self.event)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertTrue(response['ETag'].startswith(f'"{event.id}-{event.version}-'))
+
+    def test_if_modified_since(self):
+        self.age()
+        last_modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction(self.event)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_no_last_modified_within_the_same_second(self):
+        # a second change in this second would keep the date: no validator to go stale
+        Event.objects.filter(pk=self.event.pk).update(updated_at=timezone.now())
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('ETag', response)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_validators_follow_the_served_event(self):
+        with mock.patch('events.conditional._validators') as validators:
+            # the decorator sees an older row than the view
+            validators.return_value.first.return_value = (0, timezone.now() - timedelta(days=1))
+            response = self.client.get(self.url)
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertTrue(response['ETag'].startswith(f'"{event.id}-{event.version}-'))
+
+    def test_foreign_event_is_not_revealed(self):
+        other = Event.objects.create(title='Private', owner=self.users[5])
+        response = self.client.get(f'/api/events/{other.id}/balances/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchTests(EventDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        search._backend = None
+        mine, theirs = self.events
+        self.user = mine.owner
+        EventParticipant.objects.filter(event=theirs, user=self.user).delete()
+        self.rows = {}
+        for event, payer, description in [
+            (mine, self.users[0], 'Pizza Friday'),
+            (mine, self.users[1], 'pizza and beer'),
+            (mine, self.users[1], 'Café crème'),
+            (mine, self.users[2], 'Taxi to the airport'),
+            (theirs, self.users[1], 'Pizza for somebody else'),
+        ]:
+            t = Transaction.objects.create(event=event, payer=payer, amount=10 * CENT, description=description)
+            self.rows[description] = t.id
+        self.client.force_login(self.user)
+
+    def ids(self, *descriptions):
+        return sorted(self.rows[d] for d in descriptions)
+
+    def fts(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM events_transaction_fts WHERE events_transaction_fts MATCH %s ORDER BY rowid',
+                [query],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search(self, **params):
+        response = self.client.get('/api/events/search/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_triggers_keep_the_index_in_sync(self):
+        self.assertEqual(self.fts('pizza'), self.ids('Pizza Friday', 'pizza and beer', 'Pizza for somebody else'))
+
+        t = Transaction.objects.get(pk=self.rows['Pizza Friday'])
+        t.description = 'Sushi Friday'
+        t.save()
+        self.assertEqual(self.fts('sushi'), [t.id])
+        self.assertNotIn(t.id, self.fts('pizza'))
+
+        Transaction.objects.filter(pk=self.rows['pizza and beer']).delete()
+        self.assertEqual(self.fts('beer'), [])
+
+        # bulk paths bypass signals, not triggers
+        Transaction.objects.bulk_create([Transaction(event=self.events[0], amount=CENT, description='Bulk noodles')])
+        Transaction.objects.filter(description='Taxi to the airport').update(description='Bus to the airport')
+        self.assertEqual(len(self.fts('noodles')), 1)
+        self.assertEqual(self.fts('taxi'), [])
+        self.assertEqual(self.fts('bus'), [self.rows['Taxi to the airport']])
+
+    def test_search_api(self):
+        data = self.search(q='piz')  # last word is a prefix
+        self.assertEqual(data['backend'], 'sqlite-fts5')
+        self.assertEqual(sorted(r['id'] for r in data['results']), self.ids('Pizza Friday', 'pizza and beer'))
+
+        self.assertEqual([r['id'] for r in self.search(q='pizza beer')['results']], self.ids('pizza and beer'))
+        self.assertEqual([r['id'] for r in self.search(q='cafe')['results']], self.ids('Café crème'))
+        self.assertEqual(
+            [r['id'] for r in self.search(q='pizza', payer=self.users[0].id)['results']], self.ids('Pizza Friday'),
+        )
+        self.assertEqual(self.search(q='pizza', event=self.events[1].id)['results'], [])
+        # user input is never FTS syntax
+        self.assertEqual(self.search(q='pizza" OR taxi*')['results'], [])
+
+        page = self.search(q='pizza', limit=1)
+        self.assertEqual((len(page['results']), page['next_offset']), (1, 1))
+
+    def test_bad_parameters(self):
+        for params in [{}, {'q': 'x', 'limit': 0}, {'q': 'x', 'event': 'abc'}, {'q': 'x', 'date_from': 'soon'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/events/search/', params).status_code, 400)
+
+    def test_backends_find_the_same_rows(self):
+        scope = Transaction.objects.filter(event=self.events[0])
+        for query in ['pizza', 'airport taxi', 'beer']:
+            with self.subTest(query=query):
+                fts = sorted(pk for pk, _ in search.SqliteFtsBackend().search(scope, query, limit=10))
+                contains = sorted(pk for pk, _ in search.ContainsSearchBackend().search(scope, query, limit=10))
+                self.assertEqual(fts, contains)
+
+
+class CachedSettlementTests(EventDataMixin, TestCase):
+    """Plans from the cache / incremental planner settle the ledger exactly."""
+
+    def test_plans_settle_the_ledger(self):
+        event = self.events[0]
+        modes = set()
+        for step in range(60):
+            with self.captureOnCommitCallbacks(execute=True):
+                if step % 5 == 4:
+                    Transaction.objects.filter(event=event).order_by('?').first().delete()
+                else:
+                    self.add_transaction(event)
+            plan = cached_event_settlement(event.id)
+            modes.add(plan.mode)
+            balances = event_balances(event.id)
+            with self.subTest(step=step):
+                self.assertEqual(_settled(balances, plan.transfers), {})
+                # served again from the cache, same plan
+                self.assertEqual(cached_event_settlement(event.id), plan)
+        # the later plans come from the planner, not from a full recompute
+        self.assertIn('incremental', modes)
+
+    def test_planner_follows_an_edited_payer(self):
+        event = self.events[1]
+        for _ in range(10):
+            self.add_transaction(event)
+        cached_event_settlement(event.id)  # seeds the planner
+
+        with self.captureOnCommitCallbacks(execute=True):
+            t = Transaction.objects.filter(event=event).first()
+            t.payer = self.users[5]
+            t.save()
+        plan = cached_event_settlement(event.id)
+        self.assertEqual(_settled(event_balances(event.id), plan.transfers), {})
+
+
+class PlannerRaceTests(EventDataMixin, TestCase):
+    """A planner seeded while a write is between record_* and commit is never trusted."""
+
+    def test_seed_between_delta_and_bump(self):
+        event = self.events[0]
+        for _ in range(4):
+            self.add_transaction(event)
+        version = Event.objects.get(pk=event.pk).version
+        before = event_balances(event.id)
+        payer, debtor = self.users[0].id, self.users[1].id
+
+        # one change: its delta and its bump, queued until the commit
+        with self.captureOnCommitCallbacks() as callbacks:
+            planner.record_delta(event.id, {payer: 500, debtor: -500})
+            planner.record_bump([event.id])
+        apply_delta, bump = callbacks
+
+        apply_delta()  # nobody tracks the event yet
+        # a reader that read the balances before the commit seeds now
+        planner.seed(event.id, version, before, plan_settlement(before))
+        bump()
+
+        # the planner's balances lack the delta, it must not claim version + 1
+        self.assertIsNone(planner.current_plan(event.id, version + 1))
+        self.assertNotIn(event.id, planner._planners)
+
+    def test_seed_before_the_write_is_updated(self):
+        event = self.events[0]
+        for _ in range(4):
+            self.add_transaction(event)
+        cached_event_settlement(event.id)  # seeds
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_transaction(event)
+        version = Event.objects.get(pk=event.pk).version
+        plan = planner.current_plan(event.id, version)
+        self.assertIsNotNone(plan)
+        self.assertEqual(_settled(event_balances(event.id), plan.transfers), {})
+
+
+def _brute_force_min_transfers(values):
+    """n - the largest number of zero-sum groups, by trying every partition."""
+    values = [v for v in values if v]
+
+    def groups(rest):
+        if not rest:
+            return 0
+        first, others = rest[0], rest[1:]
+        best = -1
+        for size in range(len(others) + 1):
+            for picked in combinations(range(len(others)), size):
+                if first + sum(others[i] for i in picked):
+                    continue
+                left = [v for i, v in enumerate(others) if i not in picked]
+                sub = groups(left)
+                if sub >= 0:
+                    best = max(best, 1 + sub)
+        return best
+
+    return len(values) - groups(values) if values else 0
+
+
+class SettleOptimalTests(TestCase):
+    def random_balances(self, rng, n):
+        # built from a few zero-sum groups so the exact solver can beat greedy
+        values = []
+        while len(values) < n - 1:
+            size = min(rng.randint(2, 3), n - len(values))
+            group = [rng.choice([-1, 1]) * rng.randint(1, 50) * 100 for _ in range(size - 1)]
+            values += group + [-sum(group)]
+        values = values[:n - 1]
+        values.append(-sum(values))
+        rng.shuffle(values)
+        return list(enumerate(values))
+
+    def test_minimum_number_of_transfers(self):
+        rng = random.Random(14)
+        for case in range(200):
+            balances = self.random_balances(rng, rng.randint(2, 8))
+            plan = settle_optimal(balances, time_budget=10)
+            with self.subTest(case=case, balances=balances):
+                self.assertEqual(plan.mode, 'optimal')
+                self.assertEqual(_settled(dict(balances), plan.transfers), {})
+                self.assertEqual(len(plan.transfers), _brute_force_min_transfers([c for _, c in balances]))
+                self.assertTrue(all(t.amount > 0 for t in plan.transfers))
+
+    def test_large_groups_fall_back_to_greedy(self):
+        balances = self.random_balances(random.Random(1), 20)
+        plan = settle_optimal(balances, max_participants=14)
+        self.assertEqual(plan.mode, 'greedy')
+        self.assertEqual(_settled(dict(balances), plan.transfers), {})
+
+
+class ImporterTests(EventDataMixin, TestCase):
+    def test_rejected_rows_are_reported(self):
+        event = Event.objects.select_related('owner').get(pk=self.events[0].pk)
+        csv_data = (
+            "payer,amount,description,splits\n"
+            "user0,30.00,Dinner,user0:10.00;user1:20.00\n"   # line 2: ok
+            "nobody,5.00,Taxi,\n"                            # 3: unknown payer
+            "user1,abc,Taxi,\n"                              # 4: not a number
+            "user1,-5.00,Refund,\n"                          # 5: not positive
+            "user1,1.005,Gum,\n"                             # 6: too many decimals
+            "user2,10.00,Beer,user2:4.00;user3:4.00\n"       # 7: splits do not add up
+            "user2,10.00,Beer,user2:5.00;stranger:5.00\n"    # 8: split user unknown
+            "user3,12.00,Lunch,\n"                           # 9: ok, equal split
+        )
+        result = import_transactions(event, io.StringIO(csv_data), 'csv', chunk_size=1)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.rejected, 6)
+        errors = dict(result.errors)
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 7, 8])
+        self.assertIn('not a participant', errors[3])
+        self.assertIn('not a number', errors[4])
+        self.assertIn('positive', errors[5])
+        self.assertIn('decimal places', errors[6])
+        self.assertIn('add up', errors[7])
+        self.assertIn('stranger', errors[8])
+
+        # bulk path kept the derived data in sync
+        self.assertEqual(_nonzero(event_balances(event.id)), _nonzero(compute_event_balances(event.id)))
+        event.refresh_from_db()
+        self.assertEqual(event.transactions_count, 2)
+        self.assertEqual(event.total_amount, Decimal('42.00'))
+
+    def test_invalid_jsonl_lines(self):
+        event = Event.objects.select_related('owner').get(pk=self.events[0].pk)
+        data = '{"payer": "user0", "amount": "3.00"}\nnot json\n[1, 2]\n'
+        result = import_transactions(event, io.StringIO(data), 'jsonl')
+        self.assertEqual((result.created, result.rejected), (1, 2))
+        self.assertEqual([line for line, _ in result.errors], [2, 3])
+
+    def test_resume_after_a_failed_chunk(self):
+        event = Event.objects.select_related('owner').get(pk=self.events[0].pk)
+        csv_data = "payer,amount,description,splits\n" + "".join(
+            f"user{n % 3},{n + 1}.00,Row {n},\n" if n != 4 else "nobody,1.00,Bad,\n" for n in range(10)
+        )
+        saved = []
+
+        def crash_on_third_chunk(importer):
+            if len(saved) == 2:
+                raise RuntimeError('worker died')
+            saved.append(importer.progress())
+
+        with self.assertRaises(RuntimeError):
+            import_transactions(event, io.StringIO(csv_data), 'csv', chunk_size=2, on_chunk=crash_on_third_chunk)
+        self.assertEqual(Transaction.objects.filter(event=event).count(), 4)
+
+        result = import_transactions(event, io.StringIO(csv_data), 'csv', chunk_size=2, progress=saved[-1])
+        self.assertEqual((result.created, result.rejected), (9, 1))
+        self.assertEqual([line for line, _ in result.errors], [6])
+        self.assertEqual(
+            sorted(Transaction.objects.filter(event=event).values_list('description', flat=True)),
+            sorted(f'Row {n}' for n in range(10) if n != 4),
+        )
+        self.assertEqual(_nonzero(event_balances(event.id)), _nonzero(compute_event_balances(event.id)))
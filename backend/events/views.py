@@ -1,11 +1,33 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from django.http import StreamingHttpResponse
+from django.db import transaction
+from django.db.models import F, Q
 import json
+import os
+from datetime import date, timedelta
+import shutil
+import tempfile
+from django.conf import settings
+from SplitFair.responses import JsonResponse, value_rows
 from accounts.forms import EventForm
-from events.models import Event, EventParticipant
-from django.contrib.auth.models import User
+from events.models import Event, Transaction
+from events.balances import event_balances, usernames
+from events.cache import cache_stats, cached_event_settlement
+from events.conditional import event_conditional, with_event_validators
+from events import exporter
+from events.listing import PAGE_SIZE, owned_events_page
+from events.importer import FORMATS, guess_format
+from events.netting import contributions, user_event_ids, user_global_settlement
+from events.participants import add_participants
+from events import rollups
+from events.search import get_backend
+from events.settlement import format_cents, to_cents
+from jobs.queue import enqueue
+from jobs.views import job_accepted
 
 # Старий view для HTML форми
 @login_required
@@ -13,20 +35,11 @@ def create_event_view(request):
     if request.method == "POST":
         form = EventForm(request.POST)
         if form.is_valid():
-            event = form.save(commit=False)
-            event.owner = request.user
-            event.save()
-
-            participants_text = form.cleaned_data.get('participants', '')
-            if participants_text:
-                participant_names = [name.strip() for name in participants_text.split(',')]
-                for name in participant_names:
-                    if name:
-                        user, _ = User.objects.get_or_create(username=name)
-                        EventParticipant.objects.create(
-                            event=event, 
-                            user=user,
-                            role='member')
+            with transaction.atomic():
+                event = form.save(commit=False)
+                event.owner = request.user
+                event.save()
+                add_participants(event, form.cleaned_data.get('participants', ''))
 
             return redirect("dashboard")
     else:
@@ -41,31 +54,429 @@ def create_event_api(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
-            
-            event = Event.objects.create(
-                title=data.get('title'),
-                owner=request.user
-            )
-            
-            participants = data.get('participants', [])
-            for participant_name in participants:
-                if participant_name:
-                    user, _ = User.objects.get_or_create(username=participant_name)
-                    EventParticipant.objects.create(
-                        event=event, 
-                        user=user,
-                        role='member'
-                    )
-            
+
+            with transaction.atomic():
+                event = Event.objects.create(
+                    title=data.get('title'),
+                    owner=request.user
+                )
+                added = add_participants(event, data.get('participants', []))
+
             return JsonResponse({
                 'id': event.id,
                 'title': event.title,
                 'owner': event.owner.username,
-                'participants_count': event.participants.count(),
+                'participants_count': len(added),
                 'created_at': event.created_at.isoformat()
             }, status=201)
             
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
     
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+@login_required
+@require_GET
+def events_list_api(request):
+    try:
+        events, next_cursor = owned_events_page(
+            request.user, request.GET.get('cursor'), request.GET.get('limit', PAGE_SIZE)
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': event.id,
+                'title': event.title,
+                'created_at': event.created_at.isoformat(),
+                'participants_count': event.participants_count,
+                'transactions_count': event.transactions_count,
+                'total_amount': f'{event.total_amount:.2f}',
+            }
+            for event in events
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+def user_events(user, event_id):
+    """Queryset with the event if the user may see it (owner or participant)."""
+    return (
+        Event.objects.filter(pk=event_id)
+        .filter(Q(owner=user) | Q(participants__user=user))
+        .distinct()
+    )
+
+
+def get_user_event(user, event_id):
+    return user_events(user, event_id).first()
+
+
+# Response bodies, shared with events.async_views
+
+def event_payload(event, participants):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'owner': event.owner_id,
+        'created_at': event.created_at.isoformat(),
+        'version': event.version,
+        'participants': participants,
+    }
+
+
+def balances_payload(event, balances, names):
+    return {
+        'event': event.id,
+        'balances': [
+            {'user': user_id, 'username': names.get(user_id), 'net': format_cents(cents)}
+            for user_id, cents in sorted(balances.items())
+        ],
+    }
+
+
+def settlement_payload(event, plan, names):
+    return {
+        'event': event.id,
+        'mode': plan.mode,
+        'transfers': [t.as_dict() for t in plan.transfers],
+        'users': names,
+    }
+
+
+def transfer_user_ids(transfers):
+    return [u for t in transfers for u in (t.debtor, t.creditor)]
+
+
+def participant_rows(event):
+    return event.participants.values('user_id', 'role', username=F('user__username'))
+
+
+@login_required
+@require_GET
+@event_conditional
+def event_detail_api(request, event_id):
+    event = get_user_event(request.user, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    participants = list(participant_rows(event))
+    return with_event_validators(JsonResponse(event_payload(event, participants)), event)
+
+
+@login_required
+@require_GET
+@event_conditional
+def event_balances_api(request, event_id):
+    event = get_user_event(request.user, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    balances = event_balances(event.id)
+    return with_event_validators(JsonResponse(balances_payload(event, balances, usernames(balances))), event)
+
+
+@login_required
+@require_GET
+@event_conditional
+def event_settlement_api(request, event_id):
+    event = get_user_event(request.user, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    try:
+        plan = cached_event_settlement(event.id, event.version)
+    except ValueError as e:
+        # splits of some transaction do not add up to its amount
+        return JsonResponse({'error': str(e)}, status=409)
+
+    names = usernames(transfer_user_ids(plan.transfers))
+    return with_event_validators(JsonResponse(settlement_payload(event, plan, names)), event)
+
+
+def global_settlement_payload(user, mine=False, trace_all=False):
+    event_ids, unbalanced, plan = user_global_settlement(user)
+    transfers = plan.transfers
+    if mine:
+        transfers = [t for t in transfers if user.id in (t.debtor, t.creditor)]
+
+    per_event = contributions(event_ids, None if trace_all else [user.id])
+    return {
+        'events': event_ids,
+        # splits of some transaction do not add up to its amount, see event_settlement_api
+        'unbalanced_events': unbalanced,
+        'mode': plan.mode,
+        'transfers': [t.as_dict() for t in transfers],
+        'users': usernames(transfer_user_ids(transfers)),
+        'contributions': {
+            user_id: {event_id: format_cents(cents) for event_id, cents in events.items()}
+            for user_id, events in per_event.items()
+        },
+    }
+
+
+def _global_settlement_options(request):
+    return {
+        'mine': request.GET.get('mine') in ('1', 'true', 'yes'),
+        'trace_all': request.GET.get('trace') == 'all',
+    }
+
+
+@login_required
+@require_GET
+def global_settlement_api(request):
+    """
+    One plan across all of the user's events. ?mine=1 keeps only the user's
+    own transfers, ?trace=all returns per-event contributions of every user
+    (default: just the requesting user). Events that do not balance are left
+    out and listed under ``unbalanced_events``.
+    """
+    return JsonResponse(global_settlement_payload(request.user, **_global_settlement_options(request)))
+
+
+@login_required
+@require_POST
+def global_settlement_job_api(request):
+    """Same as global_settlement_api (same query options) as a background job."""
+    job = enqueue('events.global_settlement', {
+        'user_id': request.user.id, **_global_settlement_options(request),
+    }, user=request.user)
+    return job_accepted(job)
+
+
+@login_required
+@require_POST
+def import_transactions_api(request, event_id):
+    # only the owner may bulk-load an event
+    event = Event.objects.filter(pk=event_id, owner=request.user).select_related('owner').first()
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Upload a CSV or JSON Lines file as "file"'}, status=400)
+    fmt = request.POST.get('format') or guess_format(upload.name)
+    if fmt not in FORMATS:
+        return JsonResponse({'error': f'Unknown format, expected one of {", ".join(FORMATS)}'}, status=400)
+
+    # keep the upload for the worker; it reads it line by line and deletes it
+    os.makedirs(settings.JOB_FILES_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=settings.JOB_FILES_DIR, suffix=f'.{fmt}', delete=False) as f:
+        shutil.copyfileobj(upload, f)
+    job = enqueue('events.import_transactions', {
+        'event_id': event.id, 'path': f.name, 'format': fmt,
+    }, user=request.user)
+    return job_accepted(job)
+
+
+@login_required
+@require_POST
+def rebuild_balances_api(request, event_id):
+    """Recompute the event's balance ledger from its transactions (owner only)."""
+    if not Event.objects.filter(pk=event_id, owner=request.user).exists():
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    job = enqueue('events.rebuild_balances', {'event_ids': [event_id]}, user=request.user)
+    return job_accepted(job)
+
+
+@login_required
+@require_GET
+def export_ledger_api(request, event_id):
+    event = get_user_event(request.user, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exporter.FORMATS:
+        return JsonResponse({'error': f'Unknown format, expected one of {", ".join(exporter.FORMATS)}'}, status=400)
+    include_settlement = request.GET.get('settlement') in ('1', 'true', 'yes')
+
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        exporter.stream_export(event, fmt, include_settlement=include_settlement),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="event-{event.id}-ledger.{fmt}"'
+    return response
+
+
+SEARCH_PAGE_SIZE = 20
+
+
+def _int_param(request, name, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+
+def _date_param(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+
+
+@login_required
+@require_GET
+def search_transactions_api(request):
+    """
+    Full-text search over the descriptions of transactions the user can see.
+    ?q= words (all must match, the last one as a prefix), optional ?event=,
+    ?payer= (user id), ?date_from= / ?date_to=, ?limit= / ?offset=.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    try:
+        event_id = _int_param(request, 'event')
+        payer_id = _int_param(request, 'payer')
+        date_from = _date_param(request, 'date_from')
+        date_to = _date_param(request, 'date_to')
+        limit = _int_param(request, 'limit', SEARCH_PAGE_SIZE)
+        offset = _int_param(request, 'offset', 0)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not 1 <= limit <= 100 or offset < 0:
+        return JsonResponse({'error': 'limit must be 1-100 and offset >= 0'}, status=400)
+
+    transactions = Transaction.objects.filter(event_id__in=user_event_ids(request.user))
+    if event_id is not None:
+        transactions = transactions.filter(event_id=event_id)
+    if payer_id is not None:
+        transactions = transactions.filter(payer_id=payer_id)
+    if date_from is not None:
+        transactions = transactions.filter(date__gte=date_from)
+    if date_to is not None:
+        transactions = transactions.filter(date__lte=date_to)
+
+    backend = get_backend()
+    hits = backend.search(transactions, query, limit=limit, offset=offset)
+    # plain rows, no model instances; Decimal and date are left to the encoder
+    rows = {
+        row['id']: row
+        for row in value_rows(
+            Transaction.objects.filter(pk__in=[pk for pk, _ in hits]),
+            'id', event='event_id', payer='payer__username', amount='amount',
+            description='description', date='date',
+        )
+    }
+    return JsonResponse({
+        'backend': backend.name,
+        'results': [
+            dict(rows[pk], score=round(score, 4) if score is not None else None)
+            for pk, score in hits
+            if pk in rows
+        ],
+        'next_offset': offset + limit if len(hits) == limit else None,
+    })
+
+
+ANALYTICS_DEFAULT_DAYS = 365
+ANALYTICS_MAX_DAYS = 3660
+
+
+def _analytics_range(request):
+    """``(date_from, date_to)`` from ?date_from= / ?date_to=, by default the last year."""
+    date_to = _date_param(request, 'date_to') or date.today()
+    date_from = _date_param(request, 'date_from') or date_to - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    if (date_to - date_from).days >= ANALYTICS_MAX_DAYS:
+        raise ValueError(f'at most {ANALYTICS_MAX_DAYS} days per request')
+    return date_from, date_to
+
+
+def _money(amount):
+    # SQLite sums lose the decimal places
+    return format_cents(to_cents(amount))
+
+
+def _analytics_rows(rows, key):
+    return [{key: value, 'amount': _money(amount), 'count': count} for value, amount, count in rows]
+
+
+def _analytics_totals(rows):
+    return {'amount': format_cents(sum(to_cents(amount) for _, amount, _ in rows)),
+            'count': sum(count for _, _, count in rows)}
+
+
+@login_required
+@require_GET
+def event_analytics_api(request, event_id):
+    """
+    Spending of an event per day and per payer between ?date_from= and
+    ?date_to= (default: the last 365 days). Reads only DailyRollup rows.
+    """
+    event = get_user_event(request.user, event_id)
+    if event is None:
+        return JsonResponse({'error': 'Event not found'}, status=404)
+    try:
+        date_from, date_to = _analytics_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    days = [
+        (day.isoformat(), amount, count)
+        for day, amount, count in rollups.event_daily(event.id, date_from, date_to)
+    ]
+    payers = rollups.event_payer_totals(event.id, date_from, date_to)
+    names = usernames([payer_id for payer_id, _, _ in payers])
+    return JsonResponse({
+        'event': event.id,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'total': _analytics_totals(days),
+        'days': _analytics_rows(days, 'date'),
+        'payers': [
+            {'user': payer_id, 'username': names.get(payer_id), 'amount': _money(amount), 'count': count}
+            for payer_id, amount, count in payers
+        ],
+    })
+
+
+@login_required
+@require_GET
+def user_analytics_api(request):
+    """
+    What the current user paid per day and per event between ?date_from= and
+    ?date_to= (default: the last 365 days). Reads only DailyRollup rows.
+    """
+    try:
+        date_from, date_to = _analytics_range(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    event_ids = user_event_ids(request.user)
+    days = [
+        (day.isoformat(), amount, count)
+        for day, amount, count in rollups.user_daily(request.user.id, date_from, date_to, event_ids)
+    ]
+    events = rollups.user_event_totals(request.user.id, date_from, date_to, event_ids)
+    titles = dict(Event.objects.filter(pk__in=[pk for pk, _, _ in events]).values_list('id', 'title'))
+    return JsonResponse({
+        'user': request.user.id,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'total': _analytics_totals(days),
+        'days': _analytics_rows(days, 'date'),
+        'events': [
+            {'event': event_id, 'title': titles.get(event_id), 'amount': _money(amount), 'count': count}
+            for event_id, amount, count in events
+        ],
+    })
+
+
+@staff_member_required
+@require_GET
+def settlement_cache_stats_api(request):
+    return JsonResponse(cache_stats())
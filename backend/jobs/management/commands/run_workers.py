@@ -0,0 +1,91 @@
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from jobs import queue
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the Job table. Start several of these "
+        "processes (or use --concurrency) to work on more jobs at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=1,
+                            help="Worker threads in this process. Jobs that are CPU bound scale "
+                                 "better with more processes than threads.")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=300,
+                            help="Requeue running jobs whose worker has been silent this many seconds. "
+                                 "Running jobs beat every JOBS_HEARTBEAT seconds.")
+        parser.add_argument("--requeue-interval", type=float, default=60.0,
+                            help="Seconds between checks for stale jobs of dead workers.")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when no job is due instead of waiting for more.")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        if options["requeue_interval"] <= 0:
+            raise CommandError("--requeue-interval must be positive")
+
+        self.stop = threading.Event()
+        self.options = options
+        self._requeue_stale()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{prefix}:{n}",), name=f"job-worker-{n}", daemon=True)
+            for n in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"{len(threads)} worker(s) started")
+        try:
+            # not just at startup: a worker process that dies while this one
+            # keeps running must get its jobs taken back
+            next_requeue = time.monotonic() + options["requeue_interval"]
+            while any(thread.is_alive() for thread in threads):
+                if time.monotonic() >= next_requeue:
+                    self._requeue_stale()
+                    next_requeue = time.monotonic() + options["requeue_interval"]
+                for thread in threads:
+                    thread.join(min(0.5, options["requeue_interval"]))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the current job(s)...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _requeue_stale(self):
+        close_old_connections()
+        requeued = queue.requeue_stale(self.options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+    def _loop(self, worker_id):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = queue.claim(worker_id)
+                if job is None:
+                    if self.options["once"]:
+                        return
+                    self.stop.wait(self.options["poll_interval"])
+                    continue
+
+                started = time.perf_counter()
+                status = queue.run(job)
+                style = self.style.SUCCESS if status == Job.DONE else self.style.WARNING
+                self.stdout.write(style(
+                    f"[{worker_id}] job {job.pk} {job.kind}: {status} "
+                    f"(attempt {job.attempts}/{job.max_attempts}, {time.perf_counter() - started:.2f}s)"
+                ))
+        finally:
+            connection.close()
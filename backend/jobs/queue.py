@@ -0,0 +1,162 @@
+# jobs/queue.py
+"""
+Database-backed job queue - no broker, the Job table is the queue.
+
+Apps register handlers by kind (events.jobs does it from
+``EventsConfig.ready()``):
+
+    @register('events.rebuild_balances')
+    def rebuild(job):
+        ...
+        return {'rows': 12}       # stored as job.result (JSON)
+
+Views call ``enqueue()`` and answer 202 with the job id right away;
+``manage.py run_workers`` claims and runs the jobs.
+
+Claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports
+it (PostgreSQL, MySQL 8, Oracle). SQLite has no row locks, there a job is
+claimed with a conditional ``UPDATE ... WHERE status = 'queued'`` and the
+worker that updated the row owns it. Either way each job runs once per attempt.
+
+A failing handler is retried ``max_attempts`` times, the n-th retry after
+``JOBS_RETRY_BACKOFF * 2 ** (n - 1)`` seconds (at most ``JOBS_RETRY_BACKOFF_MAX``).
+
+While a handler runs, a heartbeat thread refreshes ``locked_at`` every
+``JOBS_HEARTBEAT`` seconds; ``requeue_stale`` only takes back jobs whose worker
+stopped beating. Handlers that commit in several steps must be safe to run
+again after such a requeue (events.jobs saves import progress per chunk).
+"""
+
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('splitfair.jobs')
+
+_handlers = {}
+
+
+def register(kind):
+    """Decorator: ``handler(job) -> JSON-serializable result`` for jobs of ``kind``."""
+    def decorator(handler):
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+def handler_for(kind):
+    return _handlers.get(kind)
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None):
+    if kind not in _handlers:
+        raise ValueError(f'No handler registered for job kind "{kind}"')
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 3),
+    )
+
+
+def _claimable():
+    return Job.objects.filter(status=Job.QUEUED, run_after__lte=timezone.now()).order_by('run_after', 'id')
+
+
+def claim(worker_id):
+    """Take the next due job for ``worker_id``; None if there is nothing to do."""
+    claimed = {'status': Job.RUNNING, 'locked_by': worker_id, 'locked_at': timezone.now(), 'attempts': F('attempts') + 1}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = _claimable().select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            Job.objects.filter(pk=pk).update(**claimed)
+        return Job.objects.get(pk=pk)
+
+    # no row locks: whoever flips the status first owns the job
+    for pk in _claimable().values_list('pk', flat=True)[:10]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**claimed):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale(timeout):
+    """Put RUNNING jobs whose worker went silent for ``timeout`` seconds back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker stopped responding', finished_at=timezone.now(),
+    )
+    return failed + stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def _backoff(attempts):
+    base = getattr(settings, 'JOBS_RETRY_BACKOFF', 5)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 3600))
+
+
+def _heartbeat(job, stop, interval):
+    try:
+        while not stop.wait(interval):
+            try:
+                Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+                    locked_at=timezone.now(),
+                )
+            except DatabaseError:
+                # e.g. SQLite busy while the handler writes; the next beat tries again
+                logger.warning('Heartbeat of job %s failed', job.pk, exc_info=True)
+    finally:
+        connection.close()
+
+
+def _call(handler, job):
+    stop = threading.Event()
+    beat = threading.Thread(
+        target=_heartbeat, args=(job, stop, getattr(settings, 'JOBS_HEARTBEAT', 30)),
+        name=f'job-heartbeat-{job.pk}', daemon=True,
+    )
+    beat.start()
+    try:
+        return handler(job)
+    finally:
+        stop.set()
+        beat.join()
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns the job's new status."""
+    handler = handler_for(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind "{job.kind}"')
+        result = _call(handler, job)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed on attempt %d', job.pk, job.kind, job.attempts, exc_info=True)
+        if handler is not None and job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, error=error, locked_by='', locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=_backoff(job.attempts)),
+            )
+            return Job.QUEUED
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, error=error, finished_at=timezone.now())
+        return Job.FAILED
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, result=result, error='', finished_at=timezone.now(),
+    )
+    return Job.DONE
+
+
+def is_last_attempt(job):
+    return job.attempts >= job.max_attempts
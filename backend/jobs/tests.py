@@ -0,0 +1,151 @@
+import io
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+_calls = []
+
+
+@queue.register('tests.echo')
+def echo(job):
+    _calls.append(job.pk)
+    return {'echo': job.payload.get('value')}
+
+
+@queue.register('tests.fail')
+def fail(job):
+    raise RuntimeError(f'attempt {job.attempts} failed')
+
+
+@queue.register('tests.slow')
+def slow(job):
+    seen = []
+    for _ in range(6):
+        time.sleep(0.1)
+        seen.append(Job.objects.values_list('locked_at', flat=True).get(pk=job.pk))
+    return {'distinct_locked_at': len(set(seen))}
+
+
+@override_settings(JOBS_RETRY_BACKOFF=5, JOBS_RETRY_BACKOFF_MAX=3600)
+class QueueTests(TestCase):
+    def setUp(self):
+        _calls.clear()
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue('tests.nope')
+
+    def test_claim_takes_due_jobs_in_order(self):
+        later = queue.enqueue('tests.echo', {'value': 'later'})
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(hours=1))
+        first = queue.enqueue('tests.echo', {'value': 1})
+        second = queue.enqueue('tests.echo', {'value': 2})
+
+        job = queue.claim('w1')
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, 'w1'))
+        self.assertEqual(queue.claim('w2').pk, second.pk)
+        # the delayed job is not due, and a claimed job is not claimed twice
+        self.assertIsNone(queue.claim('w3'))
+
+    def test_run_stores_the_result(self):
+        queue.enqueue('tests.echo', {'value': 'hi'})
+        job = queue.claim('w')
+        self.assertEqual(queue.run(job), Job.DONE)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.error), (Job.DONE, {'echo': 'hi'}, ''))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_with_backoff_then_fail(self):
+        created = queue.enqueue('tests.fail', max_attempts=2)
+
+        started = timezone.now()
+        with self.assertLogs('splitfair.jobs', 'WARNING'):
+            self.assertEqual(queue.run(queue.claim('w')), Job.QUEUED)
+        job = Job.objects.get(pk=created.pk)
+        self.assertIn('attempt 1 failed', job.error)
+        self.assertGreaterEqual(job.run_after, started + timedelta(seconds=5))
+        self.assertEqual((job.locked_by, job.locked_at), ('', None))
+        self.assertIsNone(queue.claim('w'))  # backing off
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('splitfair.jobs', 'WARNING'):
+            self.assertEqual(queue.run(queue.claim('w')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('attempt 2 failed', job.error)
+
+    def test_requeue_stale(self):
+        for _ in range(3):
+            queue.enqueue('tests.echo', max_attempts=2)
+        silent, last_try, alive = (queue.claim('w') for _ in range(3))
+        old = timezone.now() - timedelta(minutes=10)
+        Job.objects.filter(pk__in=[silent.pk, last_try.pk]).update(locked_at=old)
+        Job.objects.filter(pk=last_try.pk).update(attempts=2)
+
+        self.assertEqual(queue.requeue_stale(60), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[silent.pk], Job.QUEUED)
+        self.assertEqual(statuses[last_try.pk], Job.FAILED)
+        self.assertEqual(statuses[alive.pk], Job.RUNNING)
+
+
+class WorkerTests(TransactionTestCase):
+    """Heartbeat and run_workers use their own threads and connections."""
+
+    def setUp(self):
+        _calls.clear()
+
+    @override_settings(JOBS_HEARTBEAT=0.05)
+    def test_heartbeat_keeps_a_running_job_fresh(self):
+        queue.enqueue('tests.slow')
+        job = queue.claim('w')
+        self.assertEqual(queue.run(job), Job.DONE)
+        job.refresh_from_db()
+        self.assertGreater(job.result['distinct_locked_at'], 3)
+        self.assertEqual(queue.requeue_stale(1), 0)
+
+    def test_run_workers_once(self):
+        jobs = [queue.enqueue('tests.echo', {'value': n}) for n in range(4)]
+        # a job of a worker that died before this one started
+        dead = queue.claim('dead-worker')
+        Job.objects.filter(pk=dead.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        out = io.StringIO()
+        call_command('run_workers', once=True, concurrency=2, stale_after=60, stdout=out)
+        self.assertIn('Requeued 1 stale job(s)', out.getvalue())
+        self.assertEqual(sorted(_calls), [job.pk for job in jobs])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
+    @override_settings(JOBS_HEARTBEAT=0.05)
+    def test_stale_jobs_are_requeued_while_running(self):
+        queue.enqueue('tests.slow')  # keeps a worker busy for ~0.6s
+        # claimed by another worker process that then dies, after this one started
+        orphan = queue.enqueue('tests.echo', {'value': 'orphan'})
+
+        def die_later():
+            time.sleep(0.15)
+            Job.objects.filter(pk=orphan.pk).update(
+                status=Job.RUNNING, locked_by='dead', attempts=1,
+                locked_at=timezone.now() - timedelta(hours=1),
+            )
+            connection.close()
+
+        Job.objects.filter(pk=orphan.pk).update(run_after=timezone.now() + timedelta(seconds=0.3))
+        killer = threading.Thread(target=die_later)
+        killer.start()
+        out = io.StringIO()
+        call_command(
+            'run_workers', concurrency=1, once=True, stale_after=60, requeue_interval=0.1, stdout=out,
+        )
+        killer.join()
+        self.assertIn('Requeued 1 stale job(s)', out.getvalue())
+        self.assertEqual(Job.objects.get(pk=orphan.pk).status, Job.DONE)
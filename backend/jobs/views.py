@@ -0,0 +1,40 @@
+from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from SplitFair.responses import JsonResponse
+
+from .models import Job
+
+
+def job_payload(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        # last line of the traceback is enough for API clients
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'url': reverse('job_status_api', args=[job.id]),
+    }
+
+
+def job_accepted(job):
+    """202 response for views that hand their work to a job."""
+    response = JsonResponse(job_payload(job), status=202)
+    response['Location'] = reverse('job_status_api', args=[job.id])
+    return response
+
+
+@login_required
+@require_GET
+def job_status_api(request, job_id):
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+    job = jobs.filter(pk=job_id).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(job_payload(job))
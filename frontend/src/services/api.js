@@ -39,6 +39,14 @@ export async function createEvent(data) {
   }
 }
 
+// Username suggestions for the participants field: [{ id, username, shared }]
+export async function autocompleteUsers(prefix, limit = 10) {
+  const response = await api.get("/api/users/autocomplete/", {
+    params: { q: prefix, limit },
+  });
+  return response.data.results;
+}
+
 
 export const fetchCsrfToken = async () => {
   try {